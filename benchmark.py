@@ -0,0 +1,375 @@
+"""Benchmark reproduzível das rotas da loja, do admin e do carrinho.
+
+Cria um banco SQLite temporário com um catálogo sintético (produtos, categorias
+e imagens geradas), exercita as rotas pelo cliente de testes do Flask e por um
+servidor WSGI local com clientes concorrentes, e grava em JSON a vazão, os
+percentis de latência e as consultas por requisição de cada rota. O modo
+--comparar mostra a diferença entre dois resultados e falha se houver regressão.
+
+Uso:
+    python benchmark.py --produtos 1000 --saida antes.json
+    python benchmark.py --produtos 100000 --categorias 50 --imagens 200 --clientes 16
+    python benchmark.py --comparar antes.json depois.json --tolerancia 10
+"""
+import argparse
+import hashlib
+import http.cookiejar
+import io
+import json
+import logging
+import os
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+from perf import percentil
+
+LOTE_INSERCAO = 10000
+USUARIO = ('admin', 'senha123')
+
+
+def gerar_imagem(rng, indice):
+    """Conteúdo de uma imagem JPEG sintética (bytes aleatórios se o Pillow não estiver instalado)"""
+    try:
+        from PIL import Image
+    except ImportError:
+        return rng.randbytes(50 * 1024)
+    cor = (rng.randrange(256), rng.randrange(256), rng.randrange(256))
+    imagem = Image.new('RGB', (1200, 900), cor)
+    # Um gradiente simples para a compressão não ficar irreal
+    imagem.paste((indice % 256, 128, 255 - indice % 256), (0, 0, 600, 450))
+    saida = io.BytesIO()
+    imagem.save(saida, 'JPEG', quality=85)
+    return saida.getvalue()
+
+
+def popular_banco(app, db, args):
+    """Insere categorias, imagens e produtos sintéticos; retorna (ids dos produtos, nomes das imagens)"""
+    import imagens
+    from loja_virtual.modelos import Arquivo, Categoria, Produto, User
+
+    rng = random.Random(args.semente)
+    with app.app_context():
+        db.create_all()
+        admin = User(username=USUARIO[0])
+        admin.set_password(USUARIO[1])
+        db.session.add(admin)
+        db.session.execute(Categoria.__table__.insert(), [
+            {'nome': f'Categoria {i}'} for i in range(1, args.categorias + 1)])
+
+        nomes_imagens = []
+        variantes = {}
+        for i in range(args.imagens):
+            conteudo = gerar_imagem(rng, i)
+            nome = f'{hashlib.sha256(conteudo).hexdigest()}.jpg'
+            with open(os.path.join(app.config['UPLOAD_FOLDER'], nome), 'wb') as arquivo:
+                arquivo.write(conteudo)
+            variantes[nome] = imagens.gerar_variantes(app.config['UPLOAD_FOLDER'], nome) or None
+            nomes_imagens.append(nome)
+
+        inseridos = 0
+        while inseridos < args.produtos:
+            lote = []
+            for i in range(inseridos + 1, min(inseridos + LOTE_INSERCAO, args.produtos) + 1):
+                imagem_nome = nomes_imagens[i % len(nomes_imagens)] if nomes_imagens else None
+                lote.append({
+                    'nome': f'Produto {i}',
+                    'preco': round(rng.uniform(1, 1000), 2),
+                    'descricao': f'Descrição do produto sintético {i}',
+                    'categoria_id': rng.randint(1, args.categorias) if args.categorias else None,
+                    'imagem_nome': imagem_nome,
+                    'imagem_variantes': variantes.get(imagem_nome),
+                })
+            db.session.execute(Produto.__table__.insert(), lote)
+            inseridos += len(lote)
+        if nomes_imagens:
+            usos = {nome: 0 for nome in nomes_imagens}
+            for i in range(1, args.produtos + 1):
+                usos[nomes_imagens[i % len(nomes_imagens)]] += 1
+            db.session.execute(Arquivo.__table__.insert(), [
+                {'nome': nome, 'tamanho': os.path.getsize(os.path.join(app.config['UPLOAD_FOLDER'], nome)),
+                 'referencias': total} for nome, total in usos.items()])
+        db.session.commit()
+        ids = [id for id, in db.session.query(Produto.id)]
+    return ids, nomes_imagens
+
+
+def cenarios(args, ids, nomes_imagens):
+    """Rotas medidas: nome -> (método, função que sorteia a URL). Todos os clientes fazem login."""
+    def produto(rng):
+        return rng.choice(ids)
+
+    def imagem(rng):
+        return rng.choice(nomes_imagens)
+
+    lista = {
+        'loja': ('GET', lambda rng: '/'),
+        'loja_categoria': ('GET', lambda rng: f'/?categoria={rng.randint(1, max(args.categorias, 1))}'),
+        'listar_produtos': ('GET', lambda rng: f'/listar_produtos?apos={produto(rng)}'),
+        'detalhes_produto': ('GET', lambda rng: f'/produto/{produto(rng)}'),
+        'adicionar_carrinho': ('POST', lambda rng: f'/adicionar_carrinho/{produto(rng)}'),
+        'ver_carrinho': ('GET', lambda rng: '/carrinho'),
+    }
+    if nomes_imagens:
+        lista['uploaded_file'] = ('GET', lambda rng: f'/uploads/{imagem(rng)}')
+        lista['imagem_publica'] = ('GET', lambda rng: f'/img/{imagem(rng)}')
+    if args.cenarios:
+        lista = {nome: lista[nome] for nome in args.cenarios.split(',') if nome in lista}
+    return lista
+
+
+class ContadorConsultas:
+    """Conta as instruções SQL executadas pela aplicação (em qualquer thread)"""
+
+    def __init__(self):
+        self.total = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        with self._lock:
+            self.total += 1
+
+
+def resumir(latencias, erros, bytes_recebidos, duracao, consultas):
+    latencias = sorted(latencias)
+    total = len(latencias)
+    return {
+        'requisicoes': total,
+        'erros': erros,
+        'requisicoes_por_s': round(total / duracao, 1) if duracao else None,
+        'p50_ms': round(percentil(latencias, 50), 2),
+        'p95_ms': round(percentil(latencias, 95), 2),
+        'p99_ms': round(percentil(latencias, 99), 2),
+        'max_ms': round(latencias[-1], 2),
+        'media_ms': round(sum(latencias) / total, 2),
+        'consultas_por_requisicao': round(consultas / total, 2),
+        'bytes_medio': round(bytes_recebidos / total),
+    }
+
+
+def medir_cliente_teste(app, contador, rotas, args):
+    """Requisições sequenciais pelo cliente de testes do Flask (sem rede)"""
+    resultados = {}
+    cliente = app.test_client()
+    cliente.post('/login', data=dict(zip(('username', 'password'), USUARIO)))
+    for nome, (metodo, gerar_url) in rotas.items():
+        rng = random.Random(args.semente)
+        for _ in range(args.aquecimento):
+            cliente.open(gerar_url(rng), method=metodo).close()
+        latencias, erros, recebidos = [], 0, 0
+        consultas_antes = contador.total
+        inicio = time.perf_counter()
+        for _ in range(args.requisicoes):
+            antes = time.perf_counter()
+            resposta = cliente.open(gerar_url(rng), method=metodo)
+            recebidos += len(resposta.get_data())
+            latencias.append((time.perf_counter() - antes) * 1000)
+            erros += resposta.status_code >= 400
+            resposta.close()
+        duracao = time.perf_counter() - inicio
+        resultados[nome] = resumir(latencias, erros, recebidos, duracao, contador.total - consultas_antes)
+    return resultados
+
+
+class SemRedirecionar(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        return None
+
+
+def medir_servidor(app, contador, rotas, args):
+    """Requisições concorrentes (uma sessão por cliente) a um servidor WSGI local com threads"""
+    from werkzeug.serving import make_server
+
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)  # sem uma linha de log por requisição
+    servidor = make_server('127.0.0.1', 0, app, threaded=True)
+    thread_servidor = threading.Thread(target=servidor.serve_forever, daemon=True)
+    thread_servidor.start()
+    base = f'http://127.0.0.1:{servidor.server_port}'
+
+    def abrir(opener, metodo, url, dados=None):
+        corpo = urllib.parse.urlencode(dados).encode() if dados is not None else (b'' if metodo == 'POST' else None)
+        requisicao = urllib.request.Request(base + url, data=corpo, method=metodo)
+        try:
+            with opener.open(requisicao, timeout=60) as resposta:
+                return resposta.status, len(resposta.read())
+        except urllib.error.HTTPError as erro:
+            return erro.code, len(erro.read())
+
+    openers = []
+    for _ in range(args.clientes):
+        opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()),
+                                             SemRedirecionar())
+        abrir(opener, 'POST', '/login', dict(zip(('username', 'password'), USUARIO)))
+        openers.append(opener)
+
+    resultados = {}
+    try:
+        for nome, (metodo, gerar_url) in rotas.items():
+            por_cliente = max(1, args.requisicoes // args.clientes)
+            latencias, falhas, recebidos = [], [0], [0]
+            lock = threading.Lock()
+
+            def cliente(indice):
+                rng = random.Random(args.semente + indice)
+                opener = openers[indice]
+                for _ in range(args.aquecimento):
+                    abrir(opener, metodo, gerar_url(rng))
+                barreira.wait()
+                minhas = []
+                for _ in range(por_cliente):
+                    antes = time.perf_counter()
+                    status, tamanho = abrir(opener, metodo, gerar_url(rng))
+                    minhas.append((time.perf_counter() - antes) * 1000)
+                    with lock:
+                        falhas[0] += status >= 400
+                        recebidos[0] += tamanho
+                with lock:
+                    latencias.extend(minhas)
+
+            # O aquecimento termina antes de a medição começar, para todos os clientes
+            barreira = threading.Barrier(args.clientes + 1)
+            threads = [threading.Thread(target=cliente, args=(i,)) for i in range(args.clientes)]
+            for thread in threads:
+                thread.start()
+            barreira.wait()
+            consultas_antes = contador.total
+            inicio = time.perf_counter()
+            for thread in threads:
+                thread.join()
+            duracao = time.perf_counter() - inicio
+            resultados[nome] = resumir(latencias, falhas[0], recebidos[0], duracao,
+                                       contador.total - consultas_antes)
+    finally:
+        servidor.shutdown()
+    return resultados
+
+
+def executar(args):
+    pasta = tempfile.mkdtemp(prefix='benchmark_')
+    try:
+        return medir(args, pasta)
+    finally:
+        if args.manter:
+            print(f'Banco mantido em {pasta}', file=sys.stderr)
+        else:
+            shutil.rmtree(pasta, ignore_errors=True)
+
+
+def medir(args, pasta):
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+    from loja_virtual import create_app
+    from loja_virtual.extensoes import cache_fragmentos, db
+
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + os.path.join(pasta, 'benchmark.db'),
+        'UPLOAD_FOLDER': os.path.join(pasta, 'uploads'),
+        # Os arquivos de versão, a fila e os limites de login também ficam na pasta
+        # temporária: os da instance/ são compartilhados com a aplicação em produção
+        'CATALOGO_VERSAO_ARQUIVO': os.path.join(pasta, 'catalogo.versao'),
+        'USUARIOS_VERSAO_ARQUIVO': os.path.join(pasta, 'usuarios.versao'),
+        'FILA_DB': os.path.join(pasta, 'fila.db'),
+        'LOGIN_LIMITE_DB': os.path.join(pasta, 'limites.db'),
+    })
+    os.makedirs(app.config['UPLOAD_FOLDER'])
+    if args.sem_cache:
+        cache_fragmentos.max_itens = 0
+
+    inicio = time.perf_counter()
+    ids, nomes_imagens = popular_banco(app, db, args)
+    print(f'Banco: {pasta} | {args.produtos} produtos, {args.categorias} categorias, '
+          f'{len(nomes_imagens)} imagens ({time.perf_counter() - inicio:.1f}s)', file=sys.stderr)
+
+    contador = ContadorConsultas()
+    event.listen(Engine, 'before_cursor_execute', contador)
+    rotas = cenarios(args, ids, nomes_imagens)
+    resultado = {
+        'quando': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'plataforma': platform.platform(),
+        'parametros': {chave: valor for chave, valor in vars(args).items() if chave not in ('comparar', 'saida')},
+        'cenarios': {nome: {} for nome in rotas},
+    }
+    modos = {'cliente_teste': medir_cliente_teste, 'servidor': medir_servidor}
+    for modo in args.modos.split(','):
+        print(f'Medindo ({modo})...', file=sys.stderr)
+        for nome, medidas in modos[modo](app, contador, rotas, args).items():
+            resultado['cenarios'][nome][modo] = medidas
+    return resultado
+
+
+def comparar(caminho_antes, caminho_depois, tolerancia):
+    """Mostra a variação entre dois resultados; retorna o número de regressões"""
+    with open(caminho_antes) as arquivo:
+        antes = json.load(arquivo)
+    with open(caminho_depois) as arquivo:
+        depois = json.load(arquivo)
+
+    def variacao(anterior, atual):
+        return (atual - anterior) / anterior * 100 if anterior else 0.0
+
+    regressoes = 0
+    print(f'{"cenário":<20} {"modo":<14} {"req/s":>16} {"p50 ms":>16} {"p95 ms":>16} {"consultas":>12}')
+    for nome, modos in depois['cenarios'].items():
+        for modo, atual in modos.items():
+            anterior = antes['cenarios'].get(nome, {}).get(modo)
+            if anterior is None:
+                continue
+            vazao = variacao(anterior['requisicoes_por_s'], atual['requisicoes_por_s'])
+            p50 = variacao(anterior['p50_ms'], atual['p50_ms'])
+            p95 = variacao(anterior['p95_ms'], atual['p95_ms'])
+            consultas = atual['consultas_por_requisicao'] - anterior['consultas_por_requisicao']
+            # Uma consulta a mais por requisição é sempre regressão; tempo e vazão têm tolerância
+            piorou = vazao < -tolerancia or p95 > tolerancia or consultas >= 0.5
+            regressoes += piorou
+            print(f'{nome:<20} {modo:<14} '
+                  f'{atual["requisicoes_por_s"]:>8} {vazao:>+6.1f}% '
+                  f'{atual["p50_ms"]:>8} {p50:>+6.1f}% '
+                  f'{atual["p95_ms"]:>8} {p95:>+6.1f}% '
+                  f'{atual["consultas_por_requisicao"]:>6} {consultas:>+5.1f}'
+                  f'{"  << REGRESSÃO" if piorou else ""}')
+    return regressoes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--produtos', type=int, default=1000)
+    parser.add_argument('--categorias', type=int, default=20)
+    parser.add_argument('--imagens', type=int, default=20, help='imagens distintas, repartidas entre os produtos')
+    parser.add_argument('--requisicoes', type=int, default=200, help='requisições medidas por rota e modo')
+    parser.add_argument('--aquecimento', type=int, default=5, help='requisições descartadas por rota (e cliente)')
+    parser.add_argument('--clientes', type=int, default=8, help='clientes concorrentes no modo servidor')
+    parser.add_argument('--modos', default='cliente_teste,servidor')
+    parser.add_argument('--cenarios', help='rotas a medir, separadas por vírgula (padrão: todas)')
+    parser.add_argument('--sem-cache', action='store_true', help='desliga o cache de fragmentos da loja')
+    parser.add_argument('--semente', type=int, default=42)
+    parser.add_argument('--manter', action='store_true', help='não apaga a pasta temporária com o banco no final')
+    parser.add_argument('--saida', help='arquivo JSON de resultado (padrão: saída padrão)')
+    parser.add_argument('--comparar', nargs=2, metavar=('ANTES', 'DEPOIS'),
+                        help='compara dois resultados em vez de medir')
+    parser.add_argument('--tolerancia', type=float, default=10.0,
+                        help='variação (%%) aceita na vazão e no p95 antes de acusar regressão')
+    args = parser.parse_args()
+
+    if args.comparar:
+        regressoes = comparar(*args.comparar, args.tolerancia)
+        print(f'{regressoes} regressões encontradas.')
+        sys.exit(1 if regressoes else 0)
+
+    resultado = json.dumps(executar(args), indent=2, ensure_ascii=False)
+    if args.saida:
+        with open(args.saida, 'w') as arquivo:
+            arquivo.write(resultado)
+    else:
+        print(resultado)
+
+
+if __name__ == '__main__':
+    main()
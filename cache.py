@@ -0,0 +1,115 @@
+"""Cache em memória (por processo) com descarte LRU, expiração por TTL e limite de memória"""
+import sys
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Mapping, Sequence, Set
+
+
+def tamanho_aproximado(valor, vistos=None):
+    """Estimativa do espaço ocupado por um valor guardado no cache, em bytes.
+
+    Soma o conteúdo de dicts, sequências, conjuntos e atributos públicos de objetos
+    (ex.: os dados das facetas), contando cada objeto uma única vez.
+    """
+    if isinstance(valor, str):
+        return len(valor.encode('utf-8'))
+    if isinstance(valor, (bytes, bytearray)):
+        return len(valor)
+    if vistos is None:
+        vistos = set()
+    if id(valor) in vistos:
+        return 0
+    vistos.add(id(valor))
+    tamanho = sys.getsizeof(valor)
+    if isinstance(valor, Mapping):
+        partes = [parte for par in valor.items() for parte in par]
+    elif isinstance(valor, (Sequence, Set)):
+        partes = valor
+    else:
+        # Atributos internos (ex.: _sa_instance_state) levariam à sessão do banco inteira
+        partes = [parte for nome, parte in getattr(valor, '__dict__', {}).items() if not nome.startswith('_')]
+    return tamanho + sum(tamanho_aproximado(parte, vistos) for parte in partes)
+
+
+class CacheLRU:
+    """Cache LRU com TTL e teto de memória, seguro para uso entre threads"""
+
+    def __init__(self, max_itens=1000, max_bytes=32 * 1024 * 1024, ttl=300):
+        self.max_itens = max_itens
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._itens = OrderedDict()  # chave -> (expira_em, tamanho, valor)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.acertos = 0
+        self.falhas = 0
+        self.expirados = 0
+        self.descartados = 0
+        self.limpezas = 0
+
+    def obter(self, chave):
+        """Retorna o valor guardado ou None se ausente/expirado"""
+        with self._lock:
+            item = self._itens.get(chave)
+            if item is None:
+                self.falhas += 1
+                return None
+            expira_em, tamanho, valor = item
+            if expira_em < time.monotonic():
+                self._remover(chave)
+                self.expirados += 1
+                self.falhas += 1
+                return None
+            self._itens.move_to_end(chave)
+            self.acertos += 1
+            return valor
+
+    def guardar(self, chave, valor, ttl=None):
+        tamanho = tamanho_aproximado(valor)
+        if tamanho > self.max_bytes:
+            return
+        with self._lock:
+            if chave in self._itens:
+                self._remover(chave)
+            self._itens[chave] = (time.monotonic() + (ttl or self.ttl), tamanho, valor)
+            self._bytes += tamanho
+            # Descartar os menos usados até caber nos limites
+            while len(self._itens) > self.max_itens or self._bytes > self.max_bytes:
+                self._remover(next(iter(self._itens)))
+                self.descartados += 1
+
+    def obter_ou_calcular(self, chave, calcular, ttl=None):
+        """Retorna o valor do cache ou calcula, guarda e retorna"""
+        valor = self.obter(chave)
+        if valor is None:
+            valor = calcular()
+            self.guardar(chave, valor, ttl)
+        return valor
+
+    def limpar(self):
+        with self._lock:
+            self._itens.clear()
+            self._bytes = 0
+            self.limpezas += 1
+
+    def _remover(self, chave):
+        _, tamanho, _ = self._itens.pop(chave)
+        self._bytes -= tamanho
+
+    def estatisticas(self):
+        with self._lock:
+            consultas = self.acertos + self.falhas
+            return {
+                'itens': len(self._itens),
+                'bytes': self._bytes,
+                'max_itens': self.max_itens,
+                'max_bytes': self.max_bytes,
+                'ttl': self.ttl,
+                'acertos': self.acertos,
+                'falhas': self.falhas,
+                'taxa_acertos': round(self.acertos / consultas, 4) if consultas else None,
+                'expirados': self.expirados,
+                'descartados': self.descartados,
+                'limpezas': self.limpezas,
+            }
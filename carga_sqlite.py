@@ -0,0 +1,125 @@
+"""Teste de carga do SQLite: leituras da loja com e sem escritas concorrentes.
+
+Cria um banco temporário com produtos sintéticos e mede quantas páginas da
+loja por segundo os leitores conseguem consultar, primeiro sozinhos e depois
+com um escritor atualizando produtos sem parar (como o admin faria).
+
+Uso:
+    python carga_sqlite.py --produtos 20000 --leitores 8 --duracao 5
+    python carga_sqlite.py --sem-pragmas    # compara com o SQLite sem ajustes
+"""
+import argparse
+import os
+import random
+import shutil
+import tempfile
+import threading
+import time
+
+from sqlalchemy.exc import OperationalError
+
+
+def executar_fase(app, db, Produto, leitores, duracao, com_escritor, total_produtos):
+    from loja_virtual.catalogo import consulta_produtos
+    from loja_virtual.paginacao import paginar_keyset
+
+    parar = threading.Event()
+    leituras = [0] * leitores
+    escritas = [0]
+    erros = {'leitura': 0, 'escrita': 0}
+
+    def ler(indice):
+        with app.app_context():
+            while not parar.is_set():
+                try:
+                    pagina = paginar_keyset(consulta_produtos(), Produto.id,
+                                            apos=random.randint(0, total_produtos), por_pagina=24)
+                    len(pagina)
+                    leituras[indice] += 1
+                except OperationalError:
+                    erros['leitura'] += 1
+                finally:
+                    db.session.remove()
+
+    def escrever():
+        with app.app_context():
+            while not parar.is_set():
+                try:
+                    produto = db.session.get(Produto, random.randint(1, total_produtos))
+                    produto.preco = round(random.uniform(1, 500), 2)
+                    db.session.commit()
+                    escritas[0] += 1
+                except OperationalError:
+                    db.session.rollback()
+                    erros['escrita'] += 1
+                finally:
+                    db.session.remove()
+
+    threads = [threading.Thread(target=ler, args=(i,)) for i in range(leitores)]
+    if com_escritor:
+        threads.append(threading.Thread(target=escrever))
+    for thread in threads:
+        thread.start()
+    time.sleep(duracao)
+    parar.set()
+    for thread in threads:
+        thread.join()
+    return {
+        'leituras_por_s': round(sum(leituras) / duracao, 1),
+        'escritas_por_s': round(escritas[0] / duracao, 1),
+        'erros_leitura': erros['leitura'],
+        'erros_escrita': erros['escrita'],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--produtos', type=int, default=20000)
+    parser.add_argument('--leitores', type=int, default=8)
+    parser.add_argument('--duracao', type=float, default=5.0, help='segundos por fase')
+    parser.add_argument('--sem-pragmas', action='store_true', help='desliga os PRAGMAs de SQLITE_PRAGMAS')
+    args = parser.parse_args()
+
+    pasta = tempfile.mkdtemp(prefix='carga_sqlite_')
+    try:
+        medir(args, pasta)
+    finally:
+        shutil.rmtree(pasta, ignore_errors=True)
+
+
+def medir(args, pasta):
+    from loja_virtual import create_app
+    from loja_virtual.extensoes import db
+    from loja_virtual.modelos import Produto
+    config = {
+        'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + os.path.join(pasta, 'carga.db'),
+        # As escritas do teste mudam a versão do catálogo: os arquivos da instance/
+        # são compartilhados com a aplicação em produção e não podem ser tocados
+        'UPLOAD_FOLDER': os.path.join(pasta, 'uploads'),
+        'CATALOGO_VERSAO_ARQUIVO': os.path.join(pasta, 'catalogo.versao'),
+        'USUARIOS_VERSAO_ARQUIVO': os.path.join(pasta, 'usuarios.versao'),
+        'FILA_DB': os.path.join(pasta, 'fila.db'),
+        'LOGIN_LIMITE_DB': os.path.join(pasta, 'limites.db'),
+    }
+    if args.sem_pragmas:
+        config['SQLITE_PRAGMAS'] = {}
+    app = create_app(config)
+
+    with app.app_context():
+        db.create_all()
+        db.session.execute(Produto.__table__.insert(), [
+            {'nome': f'Produto {i}', 'preco': i % 500 + 0.9, 'descricao': 'Produto sintético'}
+            for i in range(1, args.produtos + 1)
+        ])
+        db.session.commit()
+
+    print(f'Banco: {pasta} | produtos: {args.produtos} | leitores: {args.leitores} | '
+          f'PRAGMAs: {"não" if args.sem_pragmas else "sim"}')
+    for nome, com_escritor in (('somente leitura', False), ('leitura + escrita', True)):
+        resultado = executar_fase(app, db, Produto, args.leitores, args.duracao,
+                                  com_escritor, args.produtos)
+        print(f'{nome:>18}: {resultado}')
+
+
+if __name__ == '__main__':
+    main()
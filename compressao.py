@@ -0,0 +1,105 @@
+"""Compressão das respostas (gzip ou brotli, conforme o Accept-Encoding) e
+minificação do HTML renderizado.
+
+Só são tratadas respostas já completas em memória: arquivos enviados com
+send_file (direct_passthrough) e respostas em streaming seguem sem alteração.
+"""
+import gzip
+import re
+
+from flask import request
+
+try:
+    import brotli
+except ImportError:  # brotli é opcional: sem ele só há gzip
+    brotli = None
+
+# Blocos cujo espaço em branco tem significado e não são minificados
+PRESERVADOS = re.compile(r'(<(pre|textarea|script|style)\b.*?</\2\s*>)', re.I | re.S)
+QUEBRAS = re.compile(r'[ \t\r\f\v]*\n\s*')
+
+# Codificações que podem ser aplicadas, também usadas como sufixo do ETag
+CODIFICACOES = ('br', 'gzip')
+
+
+def minificar_html(html):
+    """Remove a indentação e as linhas em branco do HTML, mantendo uma quebra de
+    linha onde havia espaço (o que preserva o espaçamento entre elementos inline)"""
+    partes = PRESERVADOS.split(html)
+    # split com dois grupos: [texto, bloco, nome da tag, texto, bloco, nome da tag, ...]
+    resultado = []
+    for indice in range(0, len(partes), 3):
+        resultado.append(QUEBRAS.sub('\n', partes[indice]))
+        if indice + 1 < len(partes):
+            resultado.append(partes[indice + 1])
+    return ''.join(resultado)
+
+
+def etag_sem_codificacao(etag):
+    """ETag gerado pela view, sem o sufixo que a compressão acrescenta (ex.: "abc-gzip" -> "abc").
+
+    Para comparar com o If-None-Match enviado por clientes que receberam a resposta comprimida.
+    """
+    base, _, codificacao = etag.rpartition('-')
+    return base if base and codificacao in CODIFICACOES else etag
+
+
+class Compressao:
+    """Comprime as respostas de uma aplicação Flask em um after_request"""
+
+    def __init__(self, app=None, min_bytes=500, tipos=(), nivel_gzip=6, nivel_brotli=5, minificar=True):
+        self.min_bytes = min_bytes        # respostas menores seguem sem compressão
+        self.tipos = set(tipos)           # mimetypes comprimidos
+        self.nivel_gzip = nivel_gzip
+        self.nivel_brotli = nivel_brotli
+        self.minificar = minificar        # minifica respostas text/html antes de comprimir
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.min_bytes = app.config.get('COMPRESSAO_MIN_BYTES', self.min_bytes)
+        self.tipos = set(app.config.get('COMPRESSAO_TIPOS', self.tipos))
+        self.nivel_gzip = app.config.get('COMPRESSAO_NIVEL_GZIP', self.nivel_gzip)
+        self.nivel_brotli = app.config.get('COMPRESSAO_NIVEL_BROTLI', self.nivel_brotli)
+        self.minificar = app.config.get('HTML_MINIFICAR', self.minificar)
+        app.after_request(self._processar)
+
+    def codificacao(self):
+        """Codificação aceita pelo cliente, preferindo brotli; None se nenhuma"""
+        aceitas = request.accept_encodings
+        if brotli is not None and aceitas.quality('br') > 0:
+            return 'br'
+        if aceitas.quality('gzip') > 0:
+            return 'gzip'
+        return None
+
+    def comprimir(self, dados, codificacao):
+        if codificacao == 'br':
+            return brotli.compress(dados, quality=self.nivel_brotli)
+        return gzip.compress(dados, compresslevel=self.nivel_gzip, mtime=0)
+
+    def _processar(self, response):
+        if (response.mimetype not in self.tipos or response.direct_passthrough or response.is_streamed
+                or not 200 <= response.status_code < 300 or response.status_code == 204
+                or 'Content-Encoding' in response.headers):
+            return response
+
+        if self.minificar and response.mimetype == 'text/html':
+            response.set_data(minificar_html(response.get_data(as_text=True)))
+
+        dados = response.get_data()
+        if len(dados) < self.min_bytes:
+            return response
+        # A resposta depende do Accept-Encoding mesmo quando não é comprimida
+        response.vary.add('Accept-Encoding')
+        codificacao = self.codificacao()
+        if codificacao is None or 'no-transform' in response.headers.get('Cache-Control', ''):
+            return response
+
+        response.set_data(self.comprimir(dados, codificacao))
+        response.headers['Content-Encoding'] = codificacao
+        etag, fraco = response.get_etag()
+        if etag:
+            # Cada codificação é uma representação diferente do recurso
+            response.set_etag(f'{etag}-{codificacao}', weak=fraco)
+        return response
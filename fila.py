@@ -0,0 +1,222 @@
+"""Fila de tarefas em segundo plano, persistida em SQLite e executada por um pool de threads.
+
+As tarefas ficam registradas em uma tabela própria, então sobrevivem a um
+reinício do processo: tarefas pendentes são retomadas na próxima vez que a
+fila for iniciada. Vários processos (ex.: workers do gunicorn) podem
+compartilhar o mesmo arquivo; cada tarefa é reivindicada com um UPDATE
+atômico e executa uma única vez.
+"""
+import atexit
+import json
+import logging
+import sqlite3
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+PENDENTE = 'pendente'
+EXECUTANDO = 'executando'
+CONCLUIDA = 'concluida'
+FALHOU = 'falhou'
+
+logger = logging.getLogger(__name__)
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS tarefa (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    tipo VARCHAR(50) NOT NULL,
+    dados TEXT NOT NULL,
+    status VARCHAR(20) NOT NULL,
+    tentativas INTEGER NOT NULL DEFAULT 0,
+    erro TEXT,
+    executar_em REAL NOT NULL,
+    criada_em REAL NOT NULL,
+    atualizada_em REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_tarefa_status ON tarefa (status, executar_em);
+"""
+
+
+class FilaTarefas:
+    """Fila de tarefas local, sem broker externo"""
+
+    def __init__(self, caminho_db=None, max_workers=2, max_tentativas=3,
+                 espera_base=2.0, tempo_limite=600):
+        self.caminho_db = caminho_db
+        self.max_workers = max_workers
+        self.max_tentativas = max_tentativas
+        self.espera_base = espera_base        # segundos antes da 1ª nova tentativa (dobra a cada falha)
+        self.tempo_limite = tempo_limite      # tarefas "executando" há mais tempo são retomadas
+        self.sincrona = False                 # executa no próprio chamador (CLI e testes)
+        self.app = None                       # as tarefas rodam dentro do contexto desta aplicação Flask
+        self._handlers = {}
+        self._iniciada = False
+        self._executor = None
+        self._timers = set()
+        self._lock = threading.Lock()
+        self._encerrando = False
+
+    def init_app(self, app):
+        """Lê FILA_DB e FILA_WORKERS da configuração e drena a fila ao fim do processo"""
+        self.app = app
+        self.caminho_db = app.config['FILA_DB']
+        self.max_workers = app.config.get('FILA_WORKERS', self.max_workers)
+        atexit.register(self.encerrar)
+
+    def tarefa(self, tipo):
+        """Decorador que registra a função que executa as tarefas de um tipo"""
+        def registrar(func):
+            self._handlers[tipo] = func
+            return func
+        return registrar
+
+    @contextmanager
+    def _conectar(self):
+        conexao = sqlite3.connect(self.caminho_db, timeout=30, isolation_level=None)
+        conexao.row_factory = sqlite3.Row
+        conexao.execute('PRAGMA journal_mode = WAL')
+        conexao.execute('PRAGMA synchronous = NORMAL')
+        try:
+            yield conexao
+        finally:
+            conexao.close()
+
+    def iniciar(self):
+        """Cria a tabela, o pool de threads e retoma as tarefas pendentes"""
+        with self._lock:
+            if self._iniciada:
+                return
+            with self._conectar() as conexao:
+                conexao.executescript(ESQUEMA)
+                # Tarefas de processos que morreram no meio da execução
+                conexao.execute(
+                    "UPDATE tarefa SET status = ?, atualizada_em = ? WHERE status = ? AND atualizada_em < ?",
+                    (PENDENTE, time.time(), EXECUTANDO, time.time() - self.tempo_limite))
+                pendentes = conexao.execute(
+                    "SELECT id, executar_em FROM tarefa WHERE status = ? ORDER BY id", (PENDENTE,)).fetchall()
+            self._iniciada = True
+            self._encerrando = False
+            if not self.sincrona:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                    thread_name_prefix='fila')
+        for linha in pendentes:
+            espera = linha['executar_em'] - time.time()
+            if espera > 0 and not self.sincrona:
+                self._agendar(linha['id'], espera)
+            else:
+                self._submeter(linha['id'])
+
+    def enfileirar(self, tipo, **dados):
+        """Registra uma tarefa e a agenda para execução; retorna o id da tarefa"""
+        if tipo not in self._handlers:
+            raise ValueError(f'Tipo de tarefa desconhecido: {tipo}')
+        self.iniciar()
+        agora = time.time()
+        with self._conectar() as conexao:
+            cursor = conexao.execute(
+                "INSERT INTO tarefa (tipo, dados, status, executar_em, criada_em, atualizada_em) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (tipo, json.dumps(dados), PENDENTE, agora, agora, agora))
+            tarefa_id = cursor.lastrowid
+        self._submeter(tarefa_id)
+        return tarefa_id
+
+    def status(self, tarefa_id):
+        """Retorna o registro da tarefa como dicionário (ou None)"""
+        with self._conectar() as conexao:
+            linha = conexao.execute("SELECT * FROM tarefa WHERE id = ?", (tarefa_id,)).fetchone()
+        return dict(linha) if linha else None
+
+    def resumo(self):
+        """Retorna a quantidade de tarefas em cada status"""
+        with self._conectar() as conexao:
+            conexao.executescript(ESQUEMA)
+            return {linha['status']: linha['total'] for linha in conexao.execute(
+                "SELECT status, COUNT(*) AS total FROM tarefa GROUP BY status")}
+
+    def _submeter(self, tarefa_id):
+        if self.sincrona or self._executor is None or self._encerrando:
+            self._executar(tarefa_id)
+        else:
+            self._executor.submit(self._executar, tarefa_id)
+
+    def _agendar(self, tarefa_id, espera):
+        def disparar():
+            with self._lock:
+                self._timers.discard(timer)
+            if not self._encerrando:
+                self._submeter(tarefa_id)
+        timer = threading.Timer(espera, disparar)
+        timer.daemon = True
+        with self._lock:
+            self._timers.add(timer)
+        timer.start()
+
+    def _executar(self, tarefa_id):
+        with self._conectar() as conexao:
+            # Reivindica a tarefa; outro worker pode ter chegado antes
+            reivindicada = conexao.execute(
+                "UPDATE tarefa SET status = ?, atualizada_em = ? WHERE id = ? AND status = ?",
+                (EXECUTANDO, time.time(), tarefa_id, PENDENTE)).rowcount
+            if not reivindicada:
+                return
+            linha = conexao.execute("SELECT * FROM tarefa WHERE id = ?", (tarefa_id,)).fetchone()
+
+        try:
+            if self.app is not None:
+                with self.app.app_context():
+                    self._handlers[linha['tipo']](**json.loads(linha['dados']))
+            else:
+                self._handlers[linha['tipo']](**json.loads(linha['dados']))
+        except Exception:
+            erro = traceback.format_exc()
+            tentativas = linha['tentativas'] + 1
+            logger.warning('Tarefa %s (%s) falhou na tentativa %s', tarefa_id, linha['tipo'], tentativas)
+            if tentativas < self.max_tentativas:
+                espera = self.espera_base * 2 ** (tentativas - 1)
+                novo_status = PENDENTE
+            else:
+                espera = 0
+                novo_status = FALHOU
+            with self._conectar() as conexao:
+                conexao.execute(
+                    "UPDATE tarefa SET status = ?, tentativas = ?, erro = ?, executar_em = ?, atualizada_em = ? "
+                    "WHERE id = ?",
+                    (novo_status, tentativas, erro, time.time() + espera, time.time(), tarefa_id))
+            if novo_status == PENDENTE and not self._encerrando and not self.sincrona:
+                self._agendar(tarefa_id, espera)
+            return
+
+        with self._conectar() as conexao:
+            conexao.execute(
+                "UPDATE tarefa SET status = ?, erro = NULL, atualizada_em = ? WHERE id = ?",
+                (CONCLUIDA, time.time(), tarefa_id))
+
+    def processar_pendentes(self):
+        """Executa no chamador todas as tarefas pendentes; retorna quantas foram processadas"""
+        with self._conectar() as conexao:
+            conexao.executescript(ESQUEMA)
+            pendentes = [linha['id'] for linha in conexao.execute(
+                "SELECT id FROM tarefa WHERE status = ? ORDER BY id", (PENDENTE,))]
+        for tarefa_id in pendentes:
+            self._executar(tarefa_id)
+        return len(pendentes)
+
+    def encerrar(self, drenar=True):
+        """Para a fila. Com drenar=True, conclui as tarefas em andamento e as pendentes."""
+        with self._lock:
+            if not self._iniciada:
+                return
+            self._iniciada = False
+            self._encerrando = True
+            for timer in self._timers:
+                timer.cancel()
+            self._timers.clear()
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=drenar, cancel_futures=not drenar)
+        if drenar:
+            # Tarefas aguardando nova tentativa rodam uma última vez agora
+            self.processar_pendentes()
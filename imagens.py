@@ -0,0 +1,91 @@
+"""Geração das variantes redimensionadas (thumb / card / detail) das imagens de produtos"""
+import os
+
+try:
+    from PIL import Image, ImageOps, UnidentifiedImageError
+except ImportError:  # Pillow é opcional: sem ele as páginas usam a imagem original
+    Image = None
+
+# Largura máxima (em pixels) de cada variante
+TAMANHOS = {
+    'thumb': 96,
+    'card': 400,
+    'detail': 1000,
+}
+
+# Extensão do arquivo -> formato do Pillow
+FORMATOS = {
+    'webp': 'WEBP',
+    'jpg': 'JPEG',
+}
+
+QUALIDADE = 80
+
+
+class ImagemCorrompida(Exception):
+    """O Pillow não conseguiu decodificar o original (ex.: arquivo truncado)"""
+
+
+# Erros que não se resolvem tentando de novo: o original sumiu ou não é uma imagem válida.
+# Os demais (ex.: disco cheio ao gravar as variantes) são propagados.
+ERROS_PERMANENTES = (FileNotFoundError,) if Image is None else \
+    (FileNotFoundError, UnidentifiedImageError, Image.DecompressionBombError, SyntaxError, ImagemCorrompida)
+
+
+def disponivel():
+    """Indica se o Pillow está instalado e as variantes podem ser geradas"""
+    return Image is not None
+
+
+def nome_variante(imagem_nome, tamanho, extensao):
+    """Nome do arquivo de uma variante, gravado ao lado do original"""
+    base = imagem_nome.rsplit('.', 1)[0]
+    return f'{base}__{tamanho}.{extensao}'
+
+
+def nomes_variantes(imagem_nome):
+    """Todos os nomes de variantes possíveis para uma imagem"""
+    return [nome_variante(imagem_nome, tamanho, extensao)
+            for tamanho in TAMANHOS for extensao in FORMATOS]
+
+
+def gerar_variantes(pasta, imagem_nome):
+    """Gera as variantes da imagem e retorna {tamanho: largura} das que foram criadas.
+
+    A imagem nunca é ampliada: quando o original é menor que um tamanho,
+    essa variante fica com a largura do original e as maiores são omitidas.
+    """
+    if Image is None:
+        return {}
+
+    try:
+        with Image.open(os.path.join(pasta, imagem_nome)) as original:
+            imagem = ImageOps.exif_transpose(original)
+            imagem.load()
+    except OSError as e:
+        # Os erros de decodificação do Pillow (ex.: "image file is truncated") são
+        # OSError sem errno; os do sistema (arquivo ausente, E/S) seguem como estão
+        if e.errno is not None or isinstance(e, UnidentifiedImageError):
+            raise
+        raise ImagemCorrompida(f'{imagem_nome}: {e}') from e
+
+    # JPEG não tem canal alfa: aplica fundo branco nas imagens transparentes
+    if imagem.mode in ('RGBA', 'LA', 'P'):
+        imagem = imagem.convert('RGBA')
+        fundo = Image.new('RGB', imagem.size, (255, 255, 255))
+        fundo.paste(imagem, mask=imagem.getchannel('A'))
+        imagem = fundo
+    elif imagem.mode != 'RGB':
+        imagem = imagem.convert('RGB')
+
+    variantes = {}
+    for tamanho, largura in sorted(TAMANHOS.items(), key=lambda item: item[1]):
+        copia = imagem.copy()
+        copia.thumbnail((largura, largura * 4), Image.LANCZOS)
+        for extensao, formato in FORMATOS.items():
+            destino = os.path.join(pasta, nome_variante(imagem_nome, tamanho, extensao))
+            copia.save(destino, formato, quality=QUALIDADE, optimize=True)
+        variantes[tamanho] = copia.width
+        if largura >= imagem.width:
+            break
+    return variantes
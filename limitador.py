@@ -0,0 +1,115 @@
+"""Limite de eventos por chave em janela deslizante (ex.: falhas de login por IP).
+
+Cada evento é registrado com o seu horário; uma chave está bloqueada enquanto
+houver `maximo` eventos nos últimos `janela` segundos. O LimitadorMemoria vale
+para um processo; o LimitadorSQLite guarda os eventos em um arquivo SQLite
+compartilhado pelos workers (ex.: gunicorn com vários processos).
+"""
+import sqlite3
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS evento_limite (
+    chave TEXT NOT NULL,
+    momento REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_evento_limite_chave ON evento_limite (chave, momento);
+"""
+
+
+class LimitadorMemoria:
+    """Janela deslizante em memória, segura para uso entre threads"""
+
+    def __init__(self, janela=300, max_chaves=10000):
+        self.janela = janela
+        self.max_chaves = max_chaves  # acima disso, descarta as chaves sem eventos recentes
+        self._eventos = {}            # chave -> deque de horários
+        self._lock = threading.Lock()
+
+    def _recentes(self, chave, agora):
+        eventos = self._eventos.get(chave)
+        if eventos is None:
+            return None
+        while eventos and eventos[0] <= agora - self.janela:
+            eventos.popleft()
+        return eventos
+
+    def registrar(self, chave):
+        agora = time.time()
+        with self._lock:
+            if chave not in self._eventos and len(self._eventos) >= self.max_chaves:
+                for antiga in [c for c in self._eventos if not self._recentes(c, agora)]:
+                    del self._eventos[antiga]
+            eventos = self._recentes(chave, agora)
+            if eventos is None:
+                eventos = self._eventos[chave] = deque()
+            eventos.append(agora)
+
+    def consultar(self, chave):
+        """Retorna (eventos na janela, segundos até o mais antigo sair dela)"""
+        agora = time.time()
+        with self._lock:
+            eventos = self._recentes(chave, agora)
+            if not eventos:
+                return 0, 0
+            return len(eventos), eventos[0] + self.janela - agora
+
+    def limpar(self, chave):
+        with self._lock:
+            self._eventos.pop(chave, None)
+
+
+class LimitadorSQLite:
+    """Janela deslizante em uma tabela SQLite, compartilhada entre processos"""
+
+    def __init__(self, caminho_db, janela=300, limpeza_a_cada=500):
+        self.caminho_db = caminho_db
+        self.janela = janela
+        self.limpeza_a_cada = limpeza_a_cada  # registros entre duas limpezas da tabela inteira
+        self._registros = 0
+        self._criada = False
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def _conectar(self):
+        conexao = sqlite3.connect(self.caminho_db, timeout=5, isolation_level=None)
+        try:
+            if not self._criada:
+                conexao.execute('PRAGMA journal_mode = WAL')
+                conexao.executescript(ESQUEMA)
+                self._criada = True
+            conexao.execute('PRAGMA synchronous = NORMAL')
+            yield conexao
+        finally:
+            conexao.close()
+
+    def registrar(self, chave):
+        agora = time.time()
+        with self._lock:
+            self._registros += 1
+            limpar_tudo = self._registros % self.limpeza_a_cada == 0
+        with self._conectar() as conexao:
+            conexao.execute("INSERT INTO evento_limite (chave, momento) VALUES (?, ?)", (chave, agora))
+            if limpar_tudo:
+                conexao.execute("DELETE FROM evento_limite WHERE momento <= ?", (agora - self.janela,))
+            else:
+                conexao.execute("DELETE FROM evento_limite WHERE chave = ? AND momento <= ?",
+                                (chave, agora - self.janela))
+
+    def consultar(self, chave):
+        """Retorna (eventos na janela, segundos até o mais antigo sair dela)"""
+        agora = time.time()
+        with self._conectar() as conexao:
+            total, mais_antigo = conexao.execute(
+                "SELECT COUNT(*), MIN(momento) FROM evento_limite WHERE chave = ? AND momento > ?",
+                (chave, agora - self.janela)).fetchone()
+        if not total:
+            return 0, 0
+        return total, mais_antigo + self.janela - agora
+
+    def limpar(self, chave):
+        with self._conectar() as conexao:
+            conexao.execute("DELETE FROM evento_limite WHERE chave = ?", (chave,))
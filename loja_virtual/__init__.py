@@ -0,0 +1,83 @@
+"""Loja virtual: criação da aplicação Flask (create_app)"""
+import os
+import sqlite3
+
+from flask import Flask, request
+from flask.sessions import SecureCookieSessionInterface
+from sqlalchemy import event
+
+from . import admin, api, auth, carrinho, categorias, comandos, loja
+from .config import RAIZ, Config, opcoes_engine
+from .extensoes import cache_fragmentos, cache_usuarios, compressao, db, fila, instrumentacao, login_manager
+from .uploads import url_imagem
+
+
+class SessaoInterface(SecureCookieSessionInterface):
+    """Sessão padrão do Flask, exceto nas imagens públicas: sem Set-Cookie nem Vary: Cookie,
+    para que as respostas possam ser guardadas por caches compartilhados"""
+    def save_session(self, app, session, response):
+        if request.endpoint == 'loja.imagem_publica':
+            return
+        super().save_session(app, session, response)
+
+
+def create_app(config=None):
+    """Cria a aplicação. config é um objeto ou dicionário aplicado sobre Config.
+
+    Nada é gravado no banco aqui: as tabelas e o usuário admin são criados
+    pelo comando criar-banco (ou pelas migrações).
+    """
+    # Templates, arquivos estáticos e instance/ continuam na raiz do projeto
+    app = Flask(__name__, root_path=RAIZ)
+    # Sem as linhas em branco e a indentação deixadas pelas tags {% ... %}
+    app.jinja_options = {**app.jinja_options, 'trim_blocks': True, 'lstrip_blocks': True}
+    app.config.from_object(Config)
+    if isinstance(config, dict):
+        app.config.update(config)
+    elif config is not None:
+        app.config.from_object(config)
+    app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', opcoes_engine(app.config['SQLALCHEMY_DATABASE_URI']))
+    if not app.config['FILA_DB']:
+        app.config['FILA_DB'] = os.path.join(app.instance_path, 'fila.db')
+    if not app.config['CATALOGO_VERSAO_ARQUIVO']:
+        app.config['CATALOGO_VERSAO_ARQUIVO'] = os.path.join(app.instance_path, 'catalogo.versao')
+    if not app.config['USUARIOS_VERSAO_ARQUIVO']:
+        app.config['USUARIOS_VERSAO_ARQUIVO'] = os.path.join(app.instance_path, 'usuarios.versao')
+    os.makedirs(app.instance_path, exist_ok=True)
+
+    db.init_app(app)
+    login_manager.init_app(app)
+    fila.init_app(app)
+    carrinho.init_app(app)
+    auth.init_app(app)
+    cache_fragmentos.max_itens = app.config['CACHE_FRAGMENTOS_MAX_ITENS']
+    cache_fragmentos.max_bytes = app.config['CACHE_FRAGMENTOS_MAX_BYTES']
+    cache_fragmentos.ttl = app.config['CACHE_FRAGMENTOS_TTL']
+    cache_usuarios.max_itens = app.config['USUARIOS_CACHE_MAX_ITENS']
+    cache_usuarios.ttl = app.config['USUARIOS_CACHE_TTL']
+    if app.config['PERF_ATIVO']:
+        instrumentacao.init_app(app)
+    # Registrada depois da instrumentação para rodar antes dela (after_request
+    # roda em ordem inversa), que assim mede os bytes já comprimidos
+    if app.config['COMPRESSAO_ATIVA']:
+        compressao.init_app(app)
+
+    # A engine é criada aqui, mas só abre conexões na primeira consulta
+    with app.app_context():
+        @event.listens_for(db.engine, 'connect')
+        def configurar_sqlite(dbapi_connection, connection_record):
+            """Aplica os PRAGMAs de SQLITE_PRAGMAS em cada nova conexão SQLite"""
+            if not isinstance(dbapi_connection, sqlite3.Connection):
+                return
+            cursor = dbapi_connection.cursor()
+            for pragma, valor in app.config['SQLITE_PRAGMAS'].items():
+                cursor.execute(f'PRAGMA {pragma} = {valor}')
+            cursor.close()
+
+    app.session_interface = SessaoInterface()
+    app.add_template_global(url_imagem)
+
+    for modulo in (loja, admin, categorias, auth, api):
+        app.register_blueprint(modulo.bp)
+    comandos.init_app(app)
+    return app
@@ -0,0 +1,484 @@
+"""Administração do catálogo: produtos, operações em lote, importação,
+exportação e estatísticas"""
+import io
+from datetime import datetime
+
+from flask import Blueprint, Response, abort, current_app, flash, get_flashed_messages, jsonify, redirect, \
+    render_template, request, send_from_directory, stream_template, stream_with_context, url_for
+from flask_login import login_required
+from sqlalchemy import select
+from sqlalchemy.exc import OperationalError
+
+from .catalogo import MARCA_LEITURA_COMPLETA, consulta_produtos, excluir_produtos_em_lote, liberar_arquivo, \
+    mover_produtos_em_lote, reajustar_precos_em_lote, referenciar_arquivo, validar_produto
+from .extensoes import cache_fragmentos, db, fila, instrumentacao
+from .modelos import Categoria, Produto
+from .paginacao import POR_PAGINA_ADMIN, ler_inteiro, ler_por_pagina, paginar_keyset
+from .transferencia import IMPORTACAO_MAX_ERROS_EXIBIDOS, comprimir_gzip, formato_importacao, gerar_exportacao, \
+    importar_produtos
+from .uploads import allowed_file, save_image
+
+bp = Blueprint('admin', __name__)
+
+# Rota para servir arquivos de upload
+@bp.route('/uploads/<filename>')
+@login_required
+def uploaded_file(filename):
+    return send_from_directory(current_app.config['UPLOAD_FOLDER'], filename)
+
+# Rota para detalhes do produto
+@bp.route('/produto/<int:id>')
+@login_required
+def detalhes_produto(id):
+    produto = consulta_produtos().filter_by(id=id).first_or_404()
+    return render_template('detalhes.html', produto=produto)
+
+@bp.route('/admin')
+def admin():
+    return redirect(url_for('admin.listar_produtos'))
+
+# Listagem em streaming (?stream=1): todos os produtos do filtro em uma só página,
+# lidos do banco em lotes e enviados ao navegador enquanto são lidos
+LISTAGEM_LOTE = 500
+LISTAGEM_BLOCO_BYTES = 32 * 1024
+
+class SaidaEmBlocos:
+    """Agrupa as partes geradas por stream_template em blocos para o servidor WSGI.
+
+    Um bloco é enviado quando passa de `tamanho` bytes ou depois de descarregar(),
+    chamado pelo template ao fim do cabeçalho e por em_lotes() a cada lote lido.
+    """
+    def __init__(self, tamanho=LISTAGEM_BLOCO_BYTES):
+        self.tamanho = tamanho
+        self.pendente = False
+
+    def descarregar(self):
+        self.pendente = True
+        return ''
+
+    def em_lotes(self, query, lote=LISTAGEM_LOTE):
+        """Itera a consulta com yield_per, pedindo um envio antes de buscar o próximo lote"""
+        for indice, item in enumerate(query.yield_per(lote), 1):
+            if indice % lote == 0:
+                self.descarregar()
+            yield item
+
+    def agrupar(self, partes):
+        bloco, tamanho = [], 0
+        for parte in partes:
+            bloco.append(parte)
+            tamanho += len(parte)
+            if self.pendente or tamanho >= self.tamanho:
+                yield ''.join(bloco)
+                bloco, tamanho = [], 0
+                self.pendente = False
+        if bloco:
+            yield ''.join(bloco)
+
+# Rota principal - lista produtos
+@bp.route('/listar_produtos')
+@login_required
+def listar_produtos():
+    # Opção de filtragem por categoria
+    categoria_id = request.args.get('categoria', None)
+    
+    # Consulta base
+    query = consulta_produtos()
+    
+    # Aplicar filtro por categoria se solicitado
+    if categoria_id:
+        try:
+            categoria_id = int(categoria_id)
+            query = query.filter_by(categoria_id=categoria_id)
+        except ValueError:
+            # Ignora o filtro se o ID não for um número válido
+            pass
+    
+    categorias = Categoria.query.order_by(Categoria.nome).all()
+    
+    if request.args.get('stream') == '1':
+        # As mensagens são lidas agora: a sessão é gravada antes de o corpo ser gerado
+        get_flashed_messages(with_categories=True)
+        saida = SaidaEmBlocos()
+        todos = query.order_by(Produto.id).prefix_with(MARCA_LEITURA_COMPLETA)
+        partes = stream_template('listar.html',
+                                 produtos=saida.em_lotes(todos),
+                                 categorias=categorias,
+                                 categoria_filtro=categoria_id,
+                                 descarregar=saida.descarregar)
+        # X-Accel-Buffering: o nginx repassa cada bloco sem esperar a resposta inteira
+        return Response(saida.agrupar(partes), mimetype='text/html', headers={'X-Accel-Buffering': 'no'})
+    
+    # Obter a página de produtos para a view
+    produtos = paginar_keyset(query, Produto.id,
+                              apos=ler_inteiro('apos'),
+                              antes=ler_inteiro('antes'),
+                              por_pagina=ler_por_pagina(POR_PAGINA_ADMIN))
+    
+    return render_template('listar.html', 
+                          produtos=produtos, 
+                          categorias=categorias, 
+                          categoria_filtro=categoria_id)
+
+@bp.route('/adicionar', methods=['GET', 'POST'])
+@login_required
+def adicionar_produto():
+    # Obter todas as categorias para o select do formulário
+    categorias = Categoria.query.order_by(Categoria.nome).all()
+    
+    if request.method == 'POST':
+        # Extrair os dados do formulário
+        nome = request.form.get('nome', '').strip()
+        preco_str = request.form.get('preco', '').strip()
+        descricao = request.form.get('descricao', '').strip()
+        categoria_id = request.form.get('categoria_id', None)
+        
+        # Converter categoria_id para None se vazio ou para inteiro
+        if categoria_id:
+            try:
+                categoria_id = int(categoria_id)
+            except ValueError:
+                categoria_id = None
+        else:
+            categoria_id = None
+        
+        # Validação de formulário
+        preco, errors = validar_produto(nome, preco_str, descricao)
+        
+        # Verificar se a categoria existe se um ID foi fornecido
+        if categoria_id:
+            categoria = Categoria.query.get(categoria_id)
+            if not categoria:
+                errors.append('A categoria selecionada não existe.')
+        
+        # Validar imagem
+        imagem_nome = None
+        if 'imagem' in request.files:
+            file = request.files['imagem']
+            if file.filename != '':
+                if not allowed_file(file.filename):
+                    errors.append('Formato de imagem não permitido. Use PNG, JPG, JPEG ou GIF.')
+                else:
+                    # A imagem será salva se não houver erros
+                    pass
+            
+        # Se houver erros, mostre-os e volte ao formulário
+        if errors:
+            for error in errors:
+                flash(error, 'danger')
+            # Retorna ao formulário com os dados preenchidos para correção
+            return render_template('adicionar.html', 
+                                  produto={'nome': nome, 'preco': preco_str, 'descricao': descricao, 'categoria_id': categoria_id},
+                                  categorias=categorias)
+        
+        # Processar o upload da imagem se foi enviada
+        if 'imagem' in request.files:
+            file = request.files['imagem']
+            if file.filename != '':
+                imagem_nome = save_image(file)
+                referenciar_arquivo(imagem_nome)
+        
+        # Se não houver erros, prossegue com a adição ao banco
+        novo_produto = Produto(
+            nome=nome, 
+            preco=preco, 
+            descricao=descricao, 
+            categoria_id=categoria_id,
+            imagem_nome=imagem_nome
+        )
+        db.session.add(novo_produto)
+        db.session.commit()
+        
+        # As variantes da imagem são geradas em segundo plano
+        if imagem_nome:
+            fila.enfileirar('processar_imagem', produto_id=novo_produto.id, imagem_nome=imagem_nome)
+        
+        flash('Produto adicionado com sucesso!', 'success')
+        return redirect(url_for('admin.listar_produtos'))
+    
+    return render_template('adicionar.html', categorias=categorias)
+
+@bp.route('/editar/<int:id>', methods=['GET', 'POST'])
+@login_required
+def editar_produto(id):
+    produto = Produto.query.get_or_404(id)
+    categorias = Categoria.query.order_by(Categoria.nome).all()
+    
+    if request.method == 'POST':
+        imagem_antiga = produto.imagem_nome
+        
+        # Extrair os dados do formulário
+        nome = request.form.get('nome', '').strip()
+        preco_str = request.form.get('preco', '').strip()
+        descricao = request.form.get('descricao', '').strip()
+        categoria_id = request.form.get('categoria_id', None)
+        manter_imagem = request.form.get('manter_imagem', 'false')
+        
+        # Converter categoria_id para None se vazio ou para inteiro
+        if categoria_id:
+            try:
+                categoria_id = int(categoria_id)
+            except ValueError:
+                categoria_id = None
+        else:
+            categoria_id = None
+        
+        # Validação de formulário
+        preco, errors = validar_produto(nome, preco_str, descricao)
+        
+        # Verificar se a categoria existe se um ID foi fornecido
+        if categoria_id:
+            categoria = Categoria.query.get(categoria_id)
+            if not categoria:
+                errors.append('A categoria selecionada não existe.')
+        
+        # Validar imagem
+        if 'imagem' in request.files:
+            file = request.files['imagem']
+            if file.filename != '':
+                if not allowed_file(file.filename):
+                    errors.append('Formato de imagem não permitido. Use PNG, JPG, JPEG ou GIF.')
+        
+        # Se houver erros, mostre-os e volte ao formulário
+        if errors:
+            for error in errors:
+                flash(error, 'danger')
+            # Cria um dicionário com os dados atuais para preencher o formulário
+            produto_form = {
+                'id': produto.id,
+                'nome': nome,
+                'preco': preco_str, 
+                'descricao': descricao,
+                'categoria_id': categoria_id,
+                'imagem_nome': produto.imagem_nome
+            }
+            return render_template('editar.html', produto=produto_form, categorias=categorias)
+        
+        # Processar o upload da imagem se foi enviada e não está marcado para manter a atual
+        if manter_imagem != 'true' and 'imagem' in request.files:
+            file = request.files['imagem']
+            if file.filename != '':
+                # Salvar nova imagem (a antiga é liberada abaixo)
+                produto.imagem_nome = save_image(file)
+                if produto.imagem_nome != imagem_antiga:
+                    produto.imagem_data = datetime.utcnow()
+                    produto.imagem_variantes = None
+            elif manter_imagem != 'true' and not produto.imagem_nome:
+                # Se não enviou imagem e escolheu não manter a atual, e não tinha imagem
+                produto.imagem_nome = None
+                produto.imagem_variantes = None
+        elif manter_imagem != 'true':
+            # Se escolheu não manter e não enviou nova imagem, remove a atual
+            produto.imagem_nome = None
+            produto.imagem_variantes = None
+        
+        # Se não houver erros, atualiza os dados
+        produto.nome = nome
+        produto.preco = preco
+        produto.descricao = descricao
+        produto.categoria_id = categoria_id
+        
+        # Atualizar as referências dos arquivos junto com o produto
+        if imagem_antiga != produto.imagem_nome:
+            if produto.imagem_nome:
+                referenciar_arquivo(produto.imagem_nome)
+            if imagem_antiga:
+                liberar_arquivo(imagem_antiga)
+        
+        db.session.commit()
+        
+        # Trabalho com arquivos fica para a fila: remover a imagem antiga e gerar variantes da nova
+        if imagem_antiga and imagem_antiga != produto.imagem_nome:
+            fila.enfileirar('remover_imagem', imagem_nome=imagem_antiga)
+        if produto.imagem_nome and produto.imagem_nome != imagem_antiga:
+            fila.enfileirar('processar_imagem', produto_id=produto.id, imagem_nome=produto.imagem_nome)
+        flash('Produto atualizado com sucesso!', 'success')
+        return redirect(url_for('admin.listar_produtos'))
+    
+    return render_template('editar.html', produto=produto, categorias=categorias)
+
+@bp.route('/excluir/<int:id>', methods=['POST'])
+@login_required
+def excluir_produto(id):
+    produto = Produto.query.get_or_404(id)
+    
+    try:
+        nome_produto = produto.nome  # Guardar o nome para mostrar na mensagem
+        imagem_nome = produto.imagem_nome
+        if imagem_nome:
+            liberar_arquivo(imagem_nome)
+        db.session.delete(produto)
+        db.session.commit()
+        
+        # Remover imagem e variantes em segundo plano (se não estiverem em uso)
+        if imagem_nome:
+            fila.enfileirar('remover_imagem', imagem_nome=imagem_nome)
+        
+        flash(f'Produto "{nome_produto}" excluído com sucesso!', 'success')
+    except Exception as e:
+        db.session.rollback()
+        flash(f'Erro ao excluir o produto: {str(e)}', 'danger')
+    
+    return redirect(url_for('admin.listar_produtos'))
+
+PERCENTUAL_MAXIMO = 1000  # maior reajuste aceito nas operações em lote
+
+# Rota para as operações em lote (excluir, mover de categoria, reajustar preço)
+@bp.route('/admin/produtos/lote', methods=['POST'])
+@login_required
+def operar_produtos_em_lote():
+    acao = request.form.get('acao')
+    categoria_filtro = ler_inteiro('categoria_filtro', origem=request.form)
+    destino = redirect(url_for('admin.listar_produtos', categoria=categoria_filtro))
+    
+    # Produtos marcados na página ou todos os do filtro atual
+    if request.form.get('escopo') == 'filtro':
+        consulta = select(Produto.id)
+        if categoria_filtro is not None:
+            consulta = consulta.where(Produto.categoria_id == categoria_filtro)
+        ids = list(db.session.scalars(consulta))
+    else:
+        ids = sorted({int(id) for id in request.form.getlist('ids') if id.isdigit()})
+    if not ids:
+        flash('Nenhum produto selecionado.', 'warning')
+        return destino
+    
+    imagens_liberadas = set()
+    if acao == 'excluir':
+        afetados, imagens_liberadas = excluir_produtos_em_lote(ids)
+        mensagem = f'{afetados} produtos excluídos.'
+    elif acao == 'mover':
+        categoria_id = ler_inteiro('categoria_id', origem=request.form)
+        if categoria_id is not None and db.session.get(Categoria, categoria_id) is None:
+            flash('A categoria selecionada não existe.', 'danger')
+            return destino
+        afetados = mover_produtos_em_lote(ids, categoria_id)
+        mensagem = f'{afetados} produtos movidos de categoria.'
+    elif acao == 'preco':
+        try:
+            percentual = float(request.form.get('percentual', '').replace(',', '.'))
+        except ValueError:
+            percentual = None
+        if percentual is None or not -100 < percentual <= PERCENTUAL_MAXIMO:
+            flash(f'Informe um percentual maior que -100 e até {PERCENTUAL_MAXIMO}.', 'danger')
+            return destino
+        afetados = reajustar_precos_em_lote(ids, percentual)
+        mensagem = f'Preço de {afetados} produtos reajustado em {percentual:+g}%.'
+    else:
+        abort(400)
+    
+    try:
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        flash(f'Erro na operação em lote: {str(e)}', 'danger')
+        return destino
+    
+    # Arquivos sem referências são apagados depois, em uma única tarefa
+    if imagens_liberadas:
+        fila.enfileirar('remover_imagens', imagens_nomes=sorted(imagens_liberadas))
+    flash(mensagem, 'success')
+    return destino
+
+# Rota para importar produtos a partir de um arquivo enviado
+@bp.route('/admin/importar', methods=['GET', 'POST'])
+@login_required
+def importar_produtos_arquivo():
+    if request.method == 'POST':
+        file = request.files.get('arquivo')
+        formato = formato_importacao(file.filename if file else '', request.form.get('formato'))
+        if not file or file.filename == '':
+            flash('Selecione um arquivo para importar.', 'danger')
+        elif not formato:
+            flash('Formato não suportado. Use um arquivo CSV ou JSONL.', 'danger')
+        else:
+            erros = []
+            def registrar_erro(linha, mensagens):
+                if len(erros) < IMPORTACAO_MAX_ERROS_EXIBIDOS:
+                    erros.append((linha, mensagens))
+            
+            gravados = {'importados': 0}
+            def lote_gravado(resumo):
+                gravados['importados'] = resumo['importados']
+            
+            # utf-8-sig ignora o BOM das planilhas exportadas pelo Excel
+            arquivo = io.TextIOWrapper(file.stream, encoding='utf-8-sig', newline='')
+            try:
+                resumo = importar_produtos(arquivo, formato,
+                                           criar_categorias=request.form.get('criar_categorias') == 'true',
+                                           registrar_erro=registrar_erro, lote_gravado=lote_gravado)
+            except UnicodeDecodeError:
+                flash('O arquivo deve estar codificado em UTF-8.', 'danger')
+            except OperationalError as e:
+                # Ex.: banco bloqueado por outra escrita; os lotes anteriores já foram gravados
+                current_app.logger.exception('Importação interrompida')
+                flash(f'Importação interrompida por um erro do banco ({e.orig}). '
+                      f'{gravados["importados"]} produtos já haviam sido gravados.', 'danger')
+            else:
+                flash(f'{resumo["importados"]} de {resumo["linhas"]} produtos importados.',
+                      'success' if not resumo['erros'] else 'warning')
+                return render_template('importar.html', resumo=resumo, erros=erros)
+    
+    return render_template('importar.html')
+
+# Rota para exportar os produtos (mesmo filtro por categoria da listagem)
+@bp.route('/admin/export')
+@login_required
+def exportar_produtos():
+    formato = request.args.get('format', 'csv')
+    if formato not in ('csv', 'jsonl'):
+        abort(400)
+    
+    consulta = (select(Produto.id, Produto.nome, Produto.preco, Produto.descricao,
+                       Produto.categoria_id, Categoria.nome, Produto.imagem_nome)
+                .outerjoin(Categoria, Produto.categoria)
+                .order_by(Produto.id)
+                .prefix_with(MARCA_LEITURA_COMPLETA))
+    categoria_id = ler_inteiro('categoria')
+    if categoria_id is not None:
+        consulta = consulta.where(Produto.categoria_id == categoria_id)
+    
+    conteudo = gerar_exportacao(consulta, formato)
+    nome_arquivo = f'produtos.{formato}'
+    mimetype = 'text/csv' if formato == 'csv' else 'application/x-ndjson'
+    if request.args.get('gzip') == '1':
+        conteudo = comprimir_gzip(conteudo)
+        nome_arquivo += '.gz'
+        mimetype = 'application/gzip'
+    # stream_with_context mantém a sessão do banco aberta enquanto a resposta é enviada
+    return Response(stream_with_context(conteudo), mimetype=mimetype,
+                    headers={'Content-Disposition': f'attachment; filename={nome_arquivo}'})
+
+# Estatísticas do cache de fragmentos da loja (deste processo)
+@bp.route('/admin/cache')
+@login_required
+def estatisticas_cache():
+    return jsonify(cache_fragmentos.estatisticas())
+
+# Percentis de tempo por endpoint das últimas requisições (com PERF_ATIVO=1)
+@bp.route('/admin/perf')
+@login_required
+def estatisticas_perf():
+    if request.args.get('limpar') == '1':
+        instrumentacao.limpar()
+    resumo = instrumentacao.resumo()
+    # Negativo fatiaria a partir do início do buffer ([-n:] com n < 0)
+    recentes = max(0, min(ler_inteiro('recentes', 0), instrumentacao.tamanho_buffer))
+    if recentes:
+        resumo['recentes'] = instrumentacao.registros()[-recentes:]
+    return jsonify(resumo)
+
+# Situação da fila de tarefas em segundo plano
+@bp.route('/admin/tarefas')
+@login_required
+def resumo_tarefas():
+    return jsonify(fila.resumo())
+
+@bp.route('/admin/tarefas/<int:id>')
+@login_required
+def status_tarefa(id):
+    tarefa = fila.status(id)
+    if tarefa is None:
+        return jsonify({'erro': 'Tarefa não encontrada'}), 404
+    return jsonify(tarefa)
+
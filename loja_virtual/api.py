@@ -0,0 +1,101 @@
+"""API JSON (somente leitura) do catálogo"""
+import hashlib
+from datetime import datetime
+
+from flask import Blueprint, current_app, jsonify, request
+
+from compressao import etag_sem_codificacao
+from .catalogo import contar_produtos_por_categoria, versao_catalogo
+from .extensoes import db
+from .modelos import Categoria, Produto
+from .paginacao import POR_PAGINA_ADMIN, ler_inteiro, ler_por_pagina, paginar_keyset
+from .uploads import url_imagem
+
+bp = Blueprint('api', __name__)
+
+# Campos que podem ser pedidos em ?fields= e a coluna de onde cada um vem
+CAMPOS_API_PRODUTO = {
+    'id': Produto.id,
+    'nome': Produto.nome,
+    'preco': Produto.preco,
+    'descricao': Produto.descricao,
+    'categoria_id': Produto.categoria_id,
+    'categoria': Categoria.nome,
+    'imagem_url': Produto.imagem_nome,
+    'imagem_data': Produto.imagem_data,
+}
+CAMPOS_API_PADRAO = ['id', 'nome', 'preco', 'categoria_id', 'imagem_url']
+
+def resposta_api_condicional(gerar):
+    """Responde 304 se o cliente já tem esta versão; senão gera o JSON com um ETag fraco.
+
+    O ETag combina a versão do catálogo (alterada a cada commit em Produto ou
+    Categoria) com os parâmetros da URL, então não é preciso consultar o banco
+    para responder 304. Clientes que receberam a resposta comprimida enviam o
+    ETag com o sufixo da codificação (ver compressao.py), que é ignorado aqui.
+    """
+    argumentos = sorted(request.args.items(multi=True))
+    etag = hashlib.sha1(f'{request.path}|{versao_catalogo()}|{argumentos}'.encode()).hexdigest()
+    enviados = {etag_sem_codificacao(tag) for tag in request.if_none_match.as_set(include_weak=True)}
+    if request.if_none_match.star_tag or etag in enviados:
+        response = current_app.response_class(status=304)
+    else:
+        response = jsonify(gerar())
+    response.set_etag(etag, weak=True)
+    response.cache_control.public = True
+    response.cache_control.no_cache = True  # pode guardar, mas deve revalidar
+    return response
+
+def serializar_valor(campo, valor):
+    if valor is None:
+        return None
+    if campo == 'imagem_url':
+        return url_imagem(valor)
+    if isinstance(valor, datetime):
+        return valor.isoformat()
+    return valor
+
+@bp.route('/api/produtos')
+def api_produtos():
+    campos = [campo.strip() for campo in request.args.get('fields', '').split(',') if campo.strip()]
+    campos = campos or CAMPOS_API_PADRAO
+    invalidos = [campo for campo in campos if campo not in CAMPOS_API_PRODUTO]
+    if invalidos:
+        return jsonify({'erro': f'Campos inválidos: {", ".join(invalidos)}',
+                        'campos_disponiveis': list(CAMPOS_API_PRODUTO)}), 400
+    
+    def gerar():
+        # O id é sempre selecionado: é o cursor da paginação
+        selecionados = ['id'] + [campo for campo in campos if campo != 'id']
+        query = db.session.query(*[CAMPOS_API_PRODUTO[campo].label(campo) for campo in selecionados])
+        if 'categoria' in selecionados:
+            query = query.outerjoin(Categoria, Produto.categoria_id == Categoria.id)
+        categoria_id = ler_inteiro('categoria')
+        if categoria_id is not None:
+            query = query.filter(Produto.categoria_id == categoria_id)
+        
+        # Linhas simples (sem instanciar objetos Produto), paginadas pelo id
+        pagina = paginar_keyset(query, Produto.id,
+                                apos=ler_inteiro('apos'),
+                                antes=ler_inteiro('antes'),
+                                por_pagina=ler_por_pagina(POR_PAGINA_ADMIN))
+        return {
+            'produtos': [{campo: serializar_valor(campo, linha._mapping[campo]) for campo in campos}
+                         for linha in pagina],
+            'anterior': pagina.anterior,
+            'proximo': pagina.proximo,
+        }
+    
+    return resposta_api_condicional(gerar)
+
+@bp.route('/api/categorias')
+def api_categorias():
+    def gerar():
+        totais = contar_produtos_por_categoria()
+        categorias = db.session.query(Categoria.id, Categoria.nome).order_by(Categoria.nome).all()
+        return {'categorias': [{'id': categoria.id, 'nome': categoria.nome,
+                                'total_produtos': totais.get(categoria.id, 0)}
+                               for categoria in categorias]}
+    
+    return resposta_api_condicional(gerar)
+
@@ -0,0 +1,110 @@
+"""Autenticação dos administradores"""
+import math
+import os
+import threading
+
+from flask import Blueprint, current_app, flash, redirect, render_template, request, url_for
+from flask_login import current_user, login_required, login_user, logout_user
+
+from limitador import LimitadorMemoria, LimitadorSQLite
+from .extensoes import db, login_manager
+from .modelos import User
+from .usuarios import carregar_usuario
+
+bp = Blueprint('auth', __name__)
+
+def init_app(app):
+    """Cria o limitador de falhas de login e o semáforo das verificações de senha"""
+    if app.config['LOGIN_LIMITE_BACKEND'] == 'sqlite':
+        caminho = app.config['LOGIN_LIMITE_DB'] or os.path.join(app.instance_path, 'limites.db')
+        limitador = LimitadorSQLite(caminho, janela=app.config['LOGIN_JANELA'])
+    else:
+        limitador = LimitadorMemoria(janela=app.config['LOGIN_JANELA'])
+    app.extensions['limitador_login'] = limitador
+    app.extensions['hashes_login'] = threading.BoundedSemaphore(app.config['LOGIN_HASHES_SIMULTANEOS'])
+
+def chaves_login(username):
+    """Chaves do limitador para a tentativa atual, com o máximo de falhas de cada uma"""
+    return [
+        (f'ip:{request.remote_addr}', current_app.config['LOGIN_MAX_FALHAS_IP']),
+        (f'usuario:{username.lower()}', current_app.config['LOGIN_MAX_FALHAS_USUARIO']),
+    ]
+
+def espera_login(chaves):
+    """Segundos até uma nova tentativa ser aceita (0 se nenhuma chave estiver bloqueada)"""
+    limitador = current_app.extensions['limitador_login']
+    espera = 0
+    for chave, maximo in chaves:
+        falhas, liberada_em = limitador.consultar(chave)
+        if falhas >= maximo:
+            espera = max(espera, liberada_em)
+    return espera
+
+def verificar_senha(user, password):
+    """check_password com um limite de verificações simultâneas por processo.
+
+    Retorna None se não houve vaga a tempo: o hash é caro de propósito, e uma
+    enxurrada de tentativas não deve ocupar todas as threads do worker.
+    """
+    hashes = current_app.extensions['hashes_login']
+    if not hashes.acquire(timeout=current_app.config['LOGIN_ESPERA_HASH']):
+        return None
+    try:
+        if not user.check_password(password):
+            return False
+        # Método de hash alterado na configuração: regera com a senha que acabou de ser conferida
+        if user.hash_desatualizado():
+            user.atualizar_hash(password)
+            db.session.commit()
+        return True
+    finally:
+        hashes.release()
+
+# Rota de login
+@bp.route('/login', methods=['GET', 'POST'])
+def login():
+    if current_user.is_authenticated:
+        return redirect(url_for('admin.admin'))
+        
+    if request.method == 'POST':
+        username = request.form.get('username', '')
+        password = request.form.get('password', '')
+        chaves = chaves_login(username)
+        
+        # Bloqueado: responde sem consultar o banco nem calcular o hash
+        espera = espera_login(chaves)
+        if espera:
+            flash(f'Muitas tentativas de login. Tente novamente em {math.ceil(espera / 60)} minuto(s).', 'danger')
+            return render_template('login.html'), 429, {'Retry-After': str(math.ceil(espera))}
+        
+        user = User.query.filter_by(username=username).first()
+        valida = verificar_senha(user, password) if user else False
+        
+        if valida is None:
+            flash('Servidor ocupado. Tente novamente em instantes.', 'warning')
+            return render_template('login.html'), 503, {'Retry-After': '1'}
+        limitador = current_app.extensions['limitador_login']
+        if valida:
+            limitador.limpar(chaves[1][0])
+            login_user(user)
+            next_page = request.args.get('next')
+            return redirect(next_page or url_for('admin.admin'))
+        else:
+            for chave, _ in chaves:
+                limitador.registrar(chave)
+            flash('Nome de usuário ou senha incorretos', 'danger')
+            
+    return render_template('login.html')
+
+# Rota de logout
+@bp.route('/logout')
+@login_required
+def logout():
+    logout_user()
+    flash('Você foi desconectado', 'success')
+    return redirect(url_for('auth.login'))
+
+@login_manager.user_loader
+def load_user(user_id):
+    return carregar_usuario(user_id)
+
@@ -0,0 +1,172 @@
+"""Carrinho de compras: armazenamentos por token e cálculo dos valores"""
+import uuid
+from datetime import datetime
+from decimal import Decimal, ROUND_HALF_UP
+
+from flask import current_app, session
+from sqlalchemy import delete, func, update
+
+from .extensoes import db, insert_com_conflito
+from .modelos import ItemCarrinho, Produto
+
+# Armazenamentos do carrinho. Todos guardam {produto_id: (quantidade, preço de referência)}
+# por token; nomes, preços atuais e imagens são buscados nos produtos só na hora de exibir.
+# Limite de unidades por adição (o mesmo max do campo quantidade da loja)
+QUANTIDADE_MAXIMA = 99
+
+class CarrinhoBackend:
+    """Interface dos armazenamentos de carrinho"""
+    def itens(self, token):
+        """Retorna {produto_id: (quantidade, preco_referencia)}"""
+        raise NotImplementedError
+    
+    def adicionar(self, token, produto_id, quantidade, preco):
+        """Soma a quantidade ao item e retorna True se ele já estava no carrinho.
+        
+        O preço de referência passa a ser o preço atual informado.
+        """
+        raise NotImplementedError
+    
+    def total_itens(self, token):
+        """Soma das quantidades do carrinho (não consulta os produtos)"""
+        raise NotImplementedError
+    
+    def esvaziar(self, token):
+        raise NotImplementedError
+
+class CarrinhoSQL(CarrinhoBackend):
+    """Carrinho na tabela item_carrinho (compartilhado entre os processos)"""
+    def itens(self, token):
+        if not token:
+            return {}
+        linhas = db.session.query(ItemCarrinho.produto_id, ItemCarrinho.quantidade, ItemCarrinho.preco_referencia) \
+            .filter(ItemCarrinho.token == token).all()
+        return {produto_id: (quantidade, preco) for produto_id, quantidade, preco in linhas}
+    
+    def adicionar(self, token, produto_id, quantidade, preco):
+        agora = datetime.utcnow()
+        insert = insert_com_conflito()
+        if insert is not None and db.engine.dialect.insert_returning:
+            # Cria o item ou soma a quantidade em uma única instrução, então duas
+            # adições simultâneas do mesmo produto não colidem na chave primária
+            instrucao = insert(ItemCarrinho).values(token=token, produto_id=produto_id, quantidade=quantidade,
+                                                    preco_referencia=preco, atualizado_em=agora)
+            instrucao = instrucao.on_conflict_do_update(
+                index_elements=[ItemCarrinho.token, ItemCarrinho.produto_id],
+                set_={'quantidade': ItemCarrinho.quantidade + instrucao.excluded.quantidade,
+                      'preco_referencia': instrucao.excluded.preco_referencia,
+                      'atualizado_em': instrucao.excluded.atualizado_em})
+            total = db.session.execute(instrucao.returning(ItemCarrinho.quantidade)).scalar()
+            db.session.commit()
+            return total > quantidade
+        atualizados = db.session.execute(
+            update(ItemCarrinho)
+            .where(ItemCarrinho.token == token, ItemCarrinho.produto_id == produto_id)
+            .values(quantidade=ItemCarrinho.quantidade + quantidade,
+                    preco_referencia=preco,
+                    atualizado_em=agora)
+        ).rowcount
+        if not atualizados:
+            db.session.add(ItemCarrinho(token=token, produto_id=produto_id,
+                                        quantidade=quantidade, preco_referencia=preco))
+        db.session.commit()
+        return bool(atualizados)
+    
+    def total_itens(self, token):
+        if not token:
+            return 0
+        return db.session.query(func.coalesce(func.sum(ItemCarrinho.quantidade), 0)) \
+            .filter(ItemCarrinho.token == token).scalar()
+    
+    def esvaziar(self, token):
+        if token:
+            db.session.execute(delete(ItemCarrinho).where(ItemCarrinho.token == token))
+            db.session.commit()
+
+class CarrinhoMemoria(CarrinhoBackend):
+    """Carrinho em memória: para desenvolvimento e testes com um único processo"""
+    def __init__(self):
+        self._carrinhos = {}
+    
+    def itens(self, token):
+        return dict(self._carrinhos.get(token, {}))
+    
+    def adicionar(self, token, produto_id, quantidade, preco):
+        carrinho = self._carrinhos.setdefault(token, {})
+        existente = produto_id in carrinho
+        quantidade_atual = carrinho[produto_id][0] if existente else 0
+        carrinho[produto_id] = (quantidade_atual + quantidade, preco)
+        return existente
+    
+    def total_itens(self, token):
+        return sum(quantidade for quantidade, _ in self._carrinhos.get(token, {}).values())
+    
+    def esvaziar(self, token):
+        self._carrinhos.pop(token, None)
+
+CARRINHO_BACKENDS = {
+    'sql': CarrinhoSQL,
+    'memoria': CarrinhoMemoria,
+}
+
+def init_app(app):
+    """Cria o armazenamento escolhido em CARRINHO_BACKEND para a aplicação"""
+    app.extensions['carrinho'] = CARRINHO_BACKENDS[app.config['CARRINHO_BACKEND']]()
+    app.context_processor(injetar_carrinho)
+
+def carrinho_backend():
+    """Armazenamento de carrinho da aplicação atual"""
+    return current_app.extensions['carrinho']
+
+# Cálculo dos valores do carrinho
+CENTAVOS = Decimal('0.01')
+
+def para_decimal(valor):
+    """Converte um preço (float do banco) em Decimal com duas casas"""
+    return Decimal(str(valor)).quantize(CENTAVOS, rounding=ROUND_HALF_UP)
+
+class LinhaCarrinho:
+    """Item do carrinho com preço atual, subtotal e avisos de mudança"""
+    def __init__(self, produto_id, quantidade, preco_referencia, produto=None):
+        self.id = produto_id
+        self.quantidade = quantidade
+        self.preco_referencia = para_decimal(preco_referencia) if preco_referencia is not None else None
+        self.indisponivel = produto is None  # produto excluído depois de ir para o carrinho
+        self.nome = produto.nome if produto else 'Produto indisponível'
+        self.imagem = produto.imagem_nome if produto else None
+        self.preco = para_decimal(produto.preco) if produto else None
+        self.subtotal = self.preco * quantidade if produto else Decimal('0.00')
+    
+    @property
+    def preco_alterado(self):
+        return (not self.indisponivel and self.preco_referencia is not None
+                and self.preco != self.preco_referencia)
+
+def precificar_carrinho(itens):
+    """Calcula as linhas e o total do carrinho com uma única consulta (WHERE id IN ...).
+
+    Recebe {produto_id: (quantidade, preco_referencia)} e retorna (linhas, total).
+    Itens cujo produto foi excluído aparecem como indisponíveis e não entram no total.
+    """
+    if not itens:
+        return [], Decimal('0.00')
+    produtos = {produto.id: produto for produto in
+                db.session.query(Produto.id, Produto.nome, Produto.preco, Produto.imagem_nome)
+                .filter(Produto.id.in_(itens))}
+    linhas = [LinhaCarrinho(produto_id, quantidade, preco_referencia, produtos.get(produto_id))
+              for produto_id, (quantidade, preco_referencia) in itens.items()]
+    linhas.sort(key=lambda linha: (linha.indisponivel, linha.nome))
+    total = sum((linha.subtotal for linha in linhas), Decimal('0.00'))
+    return linhas, total
+
+def token_carrinho(criar=False):
+    """Token do carrinho guardado na sessão (criado apenas quando necessário)"""
+    token = session.get('carrinho_token')
+    if token is None and criar:
+        token = session['carrinho_token'] = uuid.uuid4().hex
+    return token
+
+def injetar_carrinho():
+    # Função (e não valor) para só consultar o banco nas páginas que mostram o carrinho
+    return {'total_itens_carrinho': lambda: carrinho_backend().total_itens(token_carrinho())}
+
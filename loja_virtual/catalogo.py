@@ -0,0 +1,393 @@
+"""Regras do catálogo: busca, versão para o cache, validação, referências às
+imagens, tarefas da fila e operações em lote"""
+import math
+import os
+import re
+from collections import namedtuple
+
+from flask import current_app
+from sqlalchemy import and_, case, delete, func, select, text, true, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import joinedload
+
+from .extensoes import cache_fragmentos, db, fila, insert_com_conflito
+from .modelos import Arquivo, Categoria, Produto
+from .paginacao import POR_PAGINA_LOJA, Pagina, codificar_cursor, decodificar_cursor, paginar_ordenado
+from .uploads import arquivo_recente, processar_imagem, remover_imagem
+from .versoes import registrar_versao
+
+# Estratégias de carregamento para as listagens (evitam consultas N+1)
+def consulta_produtos():
+    """Consulta de produtos que já traz a categoria de cada um no mesmo SELECT"""
+    return Produto.query.options(joinedload(Produto.categoria))
+
+def contar_produtos_por_categoria():
+    """Retorna {categoria_id: total de produtos} com um único COUNT ... GROUP BY"""
+    linhas = db.session.query(Produto.categoria_id, func.count(Produto.id)) \
+        .filter(Produto.categoria_id.isnot(None)) \
+        .group_by(Produto.categoria_id) \
+        .all()
+    return dict(linhas)
+
+# Filtros da loja (facetas). FiltrosLoja é imutável para servir de chave do cache.
+# faixa é o índice em FAIXAS_PRECO; quando informada, preco_min/preco_max ficam vazios.
+FiltrosLoja = namedtuple('FiltrosLoja', 'categorias preco_min preco_max faixa com_imagem ordem')
+
+# ordem -> (coluna, decrescente); sem ordem, a loja é paginada pelo id
+ORDENS_LOJA = {
+    'preco': (Produto.preco, False),
+    'preco_desc': (Produto.preco, True),
+    'nome': (Produto.nome, False),
+    'recentes': (Produto.imagem_data, True),
+}
+
+# Faixas de preço oferecidas como faceta: minimo <= preço < maximo, sem buracos entre elas
+FAIXAS_PRECO = [(None, 50), (50, 100), (100, 250), (250, 500), (500, 1000), (1000, None)]
+
+# Marca as consultas que leem o catálogo inteiro de propósito (ver verificar-planos)
+MARCA_AGREGADO = '/* agregado do catálogo */'
+# Marca as leituras de todos os produtos do filtro (exportação e listagem em streaming):
+# sem filtro, a varredura da tabela é esperada; com filtro, ela precisa usar um índice
+MARCA_LEITURA_COMPLETA = '/* leitura completa */'
+
+def ler_filtros_loja(args):
+    """Lê os filtros da query string, ignorando valores inválidos"""
+    categorias = set()
+    for valor in args.getlist('categoria'):
+        try:
+            categorias.add(int(valor))
+        except ValueError:
+            pass
+
+    def ler_preco(nome):
+        try:
+            preco = float(args.get(nome, '').replace(',', '.'))
+        except ValueError:
+            return None
+        return preco if preco >= 0 and math.isfinite(preco) else None
+
+    ordem = args.get('ordem')
+    faixa = args.get('faixa', '')
+    faixa = int(faixa) if faixa.isdigit() and int(faixa) < len(FAIXAS_PRECO) else None
+    # A faixa escolhida substitui o mínimo/máximo digitados
+    return FiltrosLoja(categorias=tuple(sorted(categorias)),
+                       preco_min=ler_preco('preco_min') if faixa is None else None,
+                       preco_max=ler_preco('preco_max') if faixa is None else None,
+                       faixa=faixa,
+                       com_imagem=args.get('com_imagem') == '1',
+                       ordem=ordem if ordem in ORDENS_LOJA else None)
+
+def parametros_filtros(filtros):
+    """Query string normalizada dos filtros (para links gerados a partir deles)"""
+    parametros = {}
+    if filtros.categorias:
+        parametros['categoria'] = list(filtros.categorias)
+    if filtros.preco_min is not None:
+        parametros['preco_min'] = filtros.preco_min
+    if filtros.preco_max is not None:
+        parametros['preco_max'] = filtros.preco_max
+    if filtros.faixa is not None:
+        parametros['faixa'] = filtros.faixa
+    if filtros.com_imagem:
+        parametros['com_imagem'] = 1
+    if filtros.ordem:
+        parametros['ordem'] = filtros.ordem
+    return parametros
+
+def condicoes_preco(filtros):
+    """Filtro de preço: a faixa escolhida (meio aberta) ou o mínimo/máximo digitados (inclusivos)"""
+    if filtros.faixa is not None:
+        return condicoes_faixa(*FAIXAS_PRECO[filtros.faixa])
+    condicoes = []
+    if filtros.preco_min is not None:
+        condicoes.append(Produto.preco >= filtros.preco_min)
+    if filtros.preco_max is not None:
+        condicoes.append(Produto.preco <= filtros.preco_max)
+    return condicoes
+
+def condicoes_faixa(minimo, maximo):
+    condicoes = []
+    if minimo is not None:
+        condicoes.append(Produto.preco >= minimo)
+    if maximo is not None:
+        condicoes.append(Produto.preco < maximo)
+    return condicoes
+
+def condicoes_imagem(com_imagem):
+    return [Produto.imagem_nome.isnot(None)] if com_imagem else []
+
+def filtrar_produtos(query, filtros):
+    """Aplica os filtros da loja a uma consulta de produtos (só os informados, sem WHERE 1 = 1)"""
+    if filtros.categorias:
+        query = query.filter(Produto.categoria_id.in_(filtros.categorias))
+    return query.filter(*condicoes_preco(filtros),
+                        *condicoes_imagem(filtros.com_imagem))
+
+def contar_facetas(filtros):
+    """Contagens de cada faceta, cada uma com os demais filtros aplicados.
+
+    Um único SELECT ... GROUP BY categoria_id com somas condicionais traz, por
+    categoria, o total com os filtros de preço e imagem, o total com imagem
+    (sem o filtro de imagem) e o total em cada faixa de preço (sem o filtro de
+    preço). O filtro de categorias é aplicado depois, somando as linhas das
+    categorias escolhidas, então não faz parte da consulta nem da chave do cache.
+    """
+    def somar(*condicoes):
+        return func.sum(case((and_(true(), *condicoes), 1), else_=0))
+
+    no_preco = condicoes_preco(filtros)
+    na_imagem = condicoes_imagem(filtros.com_imagem)
+    colunas = [
+        Produto.categoria_id,
+        somar(*no_preco, *na_imagem),
+        somar(*no_preco, Produto.imagem_nome.isnot(None)),
+        *(somar(*na_imagem, *condicoes_faixa(minimo, maximo)) for minimo, maximo in FAIXAS_PRECO),
+    ]
+    consulta = select(*colunas).group_by(Produto.categoria_id).prefix_with(MARCA_AGREGADO)
+    return {categoria_id: (total, com_imagem, faixas)
+            for categoria_id, total, com_imagem, *faixas in db.session.execute(consulta)}
+
+def facetas_loja(versao, filtros):
+    """Facetas da loja para os filtros atuais, com as contagens guardadas no cache"""
+    chave = ('facetas', versao, filtros.preco_min, filtros.preco_max, filtros.faixa, filtros.com_imagem)
+    dados = cache_fragmentos.obter_ou_calcular(chave, lambda: {
+        'categorias': db.session.query(Categoria.id, Categoria.nome).order_by(Categoria.nome).all(),
+        'contagens': contar_facetas(filtros),
+    })
+    contagens = dados['contagens']
+    escolhidas = [contagem for categoria_id, contagem in contagens.items()
+                  if not filtros.categorias or categoria_id in filtros.categorias]
+    return {
+        'categorias': [(id, nome, contagens.get(id, (0,))[0]) for id, nome in dados['categorias']],
+        'com_imagem': sum(contagem[1] for contagem in escolhidas),
+        'faixas': [(minimo, maximo, sum(contagem[2][indice] for contagem in escolhidas))
+                   for indice, (minimo, maximo) in enumerate(FAIXAS_PRECO)],
+        'total': sum(contagem[0] for contagem in escolhidas),
+    }
+
+def montar_consulta_fts(termos):
+    """Converte o texto digitado em uma expressão MATCH segura com busca por prefixo"""
+    palavras = re.findall(r'\w+', termos)
+    return ' '.join(f'"{palavra}"*' for palavra in palavras)
+
+# Relevância (bm25) no cursor da busca: o cursor leva (relevância, id) do último item
+RELEVANCIA = db.Column('relevancia', db.Float, nullable=False)
+
+def buscar_produtos(termos, apos=None, antes=None, por_pagina=POR_PAGINA_LOJA):
+    """Página dos produtos que casam com os termos, ordenados por relevância (bm25).
+
+    Como paginar_ordenado, os cursores (apos/antes) são textos opacos.
+    """
+    consulta = montar_consulta_fts(termos)
+    if not consulta:
+        return Pagina([], None, None, por_pagina)
+    if db.engine.dialect.name != 'sqlite':
+        # O índice FTS5 só existe no SQLite; em outros bancos usa uma busca simples pelo nome
+        filtros = [Produto.nome.ilike(f'%{palavra}%') for palavra in re.findall(r'\w+', termos)]
+        return paginar_ordenado(consulta_produtos().filter(*filtros), Produto.nome, Produto.id,
+                                apos=apos, antes=antes, por_pagina=por_pagina)
+
+    def buscar_ids(cursor, voltando):
+        # O nome pesa mais que a descrição no ranking; (relevância, id) desempata
+        # relevâncias iguais, como o (coluna, id) de paginar_ordenado
+        condicao = ''
+        parametros = {'consulta': consulta, 'limite': por_pagina + 1}
+        if cursor is not None:
+            condicao = f"WHERE (relevancia, id) {'<' if voltando else '>'} (:relevancia, :id)"
+            parametros['relevancia'], parametros['id'] = cursor
+        ordem = 'DESC' if voltando else 'ASC'
+        return db.session.execute(text(
+            "SELECT relevancia, id FROM ("
+            "SELECT rowid AS id, bm25(produto_fts, 10.0, 1.0) AS relevancia "
+            "FROM produto_fts WHERE produto_fts MATCH :consulta"
+            f") {condicao} ORDER BY relevancia {ordem}, id {ordem} LIMIT :limite"
+        ), parametros).all()
+
+    cursor_antes = decodificar_cursor(antes, RELEVANCIA)
+    cursor_apos = decodificar_cursor(apos, RELEVANCIA)
+    if cursor_antes is not None:
+        # Voltando: busca na ordem inversa e inverte o resultado
+        linhas = buscar_ids(cursor_antes, True)
+        ha_mais = len(linhas) > por_pagina
+        linhas = list(reversed(linhas[:por_pagina]))
+        anterior = codificar_cursor(*linhas[0]) if ha_mais else None
+        proximo = codificar_cursor(*linhas[-1]) if linhas else None
+    else:
+        linhas = buscar_ids(cursor_apos, False)
+        ha_mais = len(linhas) > por_pagina
+        linhas = linhas[:por_pagina]
+        proximo = codificar_cursor(*linhas[-1]) if ha_mais else None
+        anterior = codificar_cursor(*linhas[0]) if cursor_apos is not None and linhas else None
+    ids = [id for _, id in linhas]
+    produtos = {p.id: p for p in consulta_produtos().filter(Produto.id.in_(ids))} if ids else {}
+    return Pagina([produtos[i] for i in ids if i in produtos], anterior, proximo, por_pagina)
+
+# A versão do catálogo muda a cada commit que altera Produto ou Categoria
+# (em qualquer processo) e faz parte das chaves do cache de fragmentos.
+MODELOS_CATALOGO = (Produto, Categoria)
+
+versao_catalogo, invalidar_catalogo = registrar_versao(MODELOS_CATALOGO, 'CATALOGO_VERSAO_ARQUIVO', cache_fragmentos)
+
+# Validação dos campos de produto, comum aos formulários e à importação em massa
+def validar_produto(nome, preco_str, descricao):
+    """Valida nome, preço e descrição; retorna (preço convertido, lista de erros)"""
+    errors = []
+    preco = 0
+    
+    if not nome:
+        errors.append('O nome do produto é obrigatório.')
+    elif len(nome) < 3:
+        errors.append('O nome do produto deve ter pelo menos 3 caracteres.')
+    elif len(nome) > 100:
+        errors.append('O nome do produto não pode ter mais de 100 caracteres.')
+    
+    try:
+        if not preco_str:
+            errors.append('O preço do produto é obrigatório.')
+        else:
+            preco = float(preco_str)
+            if not math.isfinite(preco):  # float() aceita "nan" e "inf"
+                errors.append('O preço deve ser um número válido.')
+            elif preco < 0:
+                errors.append('O preço não pode ser negativo.')
+    except ValueError:
+        errors.append('O preço deve ser um número válido.')
+    
+    if len(descricao) > 500:
+        errors.append('A descrição não pode ter mais de 500 caracteres.')
+    return preco, errors
+
+def referenciar_arquivo(nome):
+    """Soma uma referência ao arquivo (na transação atual).
+
+    O registro é criado ou incrementado em uma única instrução, então dois uploads
+    simultâneos do mesmo conteúdo novo não tentam inserir o mesmo nome.
+    """
+    caminho = os.path.join(current_app.config['UPLOAD_FOLDER'], nome)
+    tamanho = os.path.getsize(caminho) if os.path.exists(caminho) else None
+    insert = insert_com_conflito()
+    if insert is not None:
+        # INSERT ... ON CONFLICT (nome) DO UPDATE SET referencias = referencias + 1
+        db.session.execute(
+            insert(Arquivo).values(nome=nome, tamanho=tamanho, referencias=1)
+            .on_conflict_do_update(index_elements=[Arquivo.nome],
+                                   set_={'referencias': Arquivo.referencias + 1}))
+        return
+    # Outros bancos: se outro processo inserir o registro primeiro, soma a referência nele
+    incrementar = update(Arquivo).where(Arquivo.nome == nome).values(referencias=Arquivo.referencias + 1)
+    if db.session.execute(incrementar).rowcount:
+        return
+    try:
+        with db.session.begin_nested():
+            db.session.add(Arquivo(nome=nome, tamanho=tamanho, referencias=1))
+    except IntegrityError:
+        db.session.execute(incrementar)
+
+def liberar_arquivo(nome):
+    """Remove uma referência ao arquivo (na transação atual).
+
+    O arquivo em si é apagado depois do commit pela tarefa 'remover_imagem',
+    que confere se ninguém voltou a referenciá-lo.
+    """
+    db.session.execute(
+        update(Arquivo).where(Arquivo.nome == nome).values(referencias=Arquivo.referencias - 1)
+    )
+
+def nomes_referenciados():
+    """Nomes das imagens em uso (produtos e arquivos com referências), em uma consulta"""
+    consulta = select(Produto.imagem_nome).where(Produto.imagem_nome.isnot(None)) \
+        .union(select(Arquivo.nome).where(Arquivo.referencias > 0))
+    return set(db.session.scalars(consulta))
+
+# Tarefas executadas pela fila em segundo plano
+@fila.tarefa('processar_imagem')
+def tarefa_processar_imagem(produto_id, imagem_nome):
+    produto = db.session.get(Produto, produto_id)
+    # A imagem pode ter sido trocada ou o produto excluído enquanto a tarefa aguardava
+    if produto is None or produto.imagem_nome != imagem_nome:
+        return
+    # Imagem compartilhada com outro produto: as variantes já existem
+    variantes = db.session.query(Produto.imagem_variantes) \
+        .filter(Produto.imagem_nome == imagem_nome, Produto.imagem_variantes.isnot(None)) \
+        .limit(1).scalar()
+    if variantes:
+        produto.imagem_variantes = variantes
+    else:
+        processar_imagem(produto)
+    db.session.commit()
+
+@fila.tarefa('remover_imagem')
+def tarefa_remover_imagem(imagem_nome):
+    tarefa_remover_imagens([imagem_nome])
+
+@fila.tarefa('remover_imagens')
+def tarefa_remover_imagens(imagens_nomes):
+    # Só apaga os arquivos que nenhum produto voltou a usar
+    sem_referencias = delete(Arquivo).where(Arquivo.nome.in_(imagens_nomes), Arquivo.referencias <= 0)
+    if db.engine.dialect.delete_returning:
+        sem_uso = db.session.scalars(sem_referencias.returning(Arquivo.nome)).all()
+    else:
+        sem_uso = [nome for nome in imagens_nomes if db.session.execute(
+            sem_referencias.where(Arquivo.nome == nome)).rowcount]
+    db.session.commit()
+    for imagem_nome in sem_uso:
+        # Confere de novo logo antes de apagar: um upload concorrente pode ter
+        # reaproveitado o arquivo depois do commit acima
+        if arquivo_referenciado(imagem_nome) or arquivo_recente(imagem_nome):
+            continue
+        remover_imagem(imagem_nome, variantes=not conteudo_em_uso(imagem_nome.rsplit('.', 1)[0], exceto=imagem_nome))
+
+def arquivo_referenciado(imagem_nome):
+    """Indica se algum produto ou registro de Arquivo com referências usa o arquivo"""
+    em_produtos = select(Produto.id).where(Produto.imagem_nome == imagem_nome)
+    em_arquivos = select(Arquivo.nome).where(Arquivo.nome == imagem_nome, Arquivo.referencias > 0)
+    return db.session.query(em_produtos.exists()).scalar() or db.session.query(em_arquivos.exists()).scalar()
+
+def conteudo_em_uso(base, exceto=None):
+    """Indica se algum arquivo "<base>.<extensão>" (o mesmo conteúdo, em qualquer extensão)
+    ainda é usado, fora `exceto`. As variantes não levam a extensão no nome e são de todos eles."""
+    # O intervalo [base + '.', base + '/') cobre esses nomes e usa os índices
+    def mesmo_conteudo(coluna):
+        return and_(coluna >= base + '.', coluna < base + '/', coluna != exceto)
+    em_produtos = select(Produto.id).where(mesmo_conteudo(Produto.imagem_nome))
+    em_arquivos = select(Arquivo.nome).where(mesmo_conteudo(Arquivo.nome), Arquivo.referencias > 0)
+    return db.session.query(em_produtos.exists()).scalar() or db.session.query(em_arquivos.exists()).scalar()
+
+# Operações em lote da listagem de produtos: cada bloco de ids vira uma única
+# instrução UPDATE/DELETE, e todos os blocos são gravados em um único commit.
+LOTE_OPERACOES = 500  # ids por instrução (abaixo do limite de parâmetros do SQLite)
+
+def em_blocos(itens, tamanho=LOTE_OPERACOES):
+    for inicio in range(0, len(itens), tamanho):
+        yield itens[inicio:inicio + tamanho]
+
+def excluir_produtos_em_lote(ids):
+    """Exclui os produtos e libera suas imagens; retorna (excluídos, nomes das imagens liberadas)"""
+    excluidos = 0
+    imagens_liberadas = set()
+    for bloco in em_blocos(ids):
+        imagens_do_bloco = select(Produto.imagem_nome).where(Produto.id.in_(bloco), Produto.imagem_nome.isnot(None))
+        imagens_liberadas.update(db.session.scalars(imagens_do_bloco.distinct()))
+        # Cada arquivo perde uma referência por produto excluído que o usava
+        usos = select(func.count()).where(Produto.id.in_(bloco), Produto.imagem_nome == Arquivo.nome).scalar_subquery()
+        db.session.execute(
+            update(Arquivo).where(Arquivo.nome.in_(imagens_do_bloco)).values(referencias=Arquivo.referencias - usos),
+            execution_options={'synchronize_session': False})
+        excluidos += db.session.execute(
+            delete(Produto).where(Produto.id.in_(bloco)),
+            execution_options={'synchronize_session': False}).rowcount
+    return excluidos, imagens_liberadas
+
+def mover_produtos_em_lote(ids, categoria_id):
+    """Move os produtos para a categoria (None = sem categoria); retorna quantos foram alterados"""
+    return sum(db.session.execute(
+        update(Produto).where(Produto.id.in_(bloco)).values(categoria_id=categoria_id),
+        execution_options={'synchronize_session': False}).rowcount for bloco in em_blocos(ids))
+
+def reajustar_precos_em_lote(ids, percentual):
+    """Aplica o reajuste percentual (negativo = desconto) aos preços; retorna quantos foram alterados"""
+    fator = 1 + percentual / 100
+    return sum(db.session.execute(
+        update(Produto).where(Produto.id.in_(bloco)).values(preco=func.round(Produto.preco * fator, 2)),
+        execution_options={'synchronize_session': False}).rowcount for bloco in em_blocos(ids))
+
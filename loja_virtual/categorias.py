@@ -0,0 +1,128 @@
+"""Cadastro de categorias"""
+from flask import Blueprint, flash, redirect, render_template, request, url_for
+from flask_login import login_required
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+
+from .catalogo import contar_produtos_por_categoria
+from .extensoes import db
+from .modelos import Categoria, Produto
+
+bp = Blueprint('categorias', __name__)
+
+# Rotas para gerenciar categorias
+@bp.route('/categorias')
+@login_required
+def listar_categorias():
+    categorias = Categoria.query.all()
+    totais = contar_produtos_por_categoria()
+    return render_template('categorias/listar.html', categorias=categorias, totais=totais)
+
+@bp.route('/categorias/adicionar', methods=['GET', 'POST'])
+@login_required
+def adicionar_categoria():
+    if request.method == 'POST':
+        nome = request.form.get('nome', '').strip()
+        
+        # Validação
+        errors = []
+        if not nome:
+            errors.append('O nome da categoria é obrigatório.')
+        elif len(nome) < 2:
+            errors.append('O nome da categoria deve ter pelo menos 2 caracteres.')
+        elif len(nome) > 50:
+            errors.append('O nome da categoria não pode ter mais de 50 caracteres.')
+        
+        # Verificar se já existe categoria com este nome. lower() dos dois lados, para
+        # que o nome digitado seja normalizado como o do banco (usa ix_categoria_nome_lower)
+        categoria_existente = Categoria.query.filter(func.lower(Categoria.nome) == func.lower(nome)).first()
+        if categoria_existente:
+            errors.append(f'Já existe uma categoria com o nome "{nome}".')
+        
+        if errors:
+            for error in errors:
+                flash(error, 'danger')
+            return render_template('categorias/adicionar.html', categoria={'nome': nome})
+        
+        # Adicionar categoria
+        nova_categoria = Categoria(nome=nome)
+        db.session.add(nova_categoria)
+        try:
+            db.session.commit()
+        except IntegrityError:
+            # Outra requisição criou a mesma categoria depois da verificação
+            db.session.rollback()
+            flash(f'Já existe uma categoria com o nome "{nome}".', 'danger')
+            return render_template('categorias/adicionar.html', categoria={'nome': nome})
+        
+        flash(f'Categoria "{nome}" adicionada com sucesso!', 'success')
+        return redirect(url_for('categorias.listar_categorias'))
+    
+    return render_template('categorias/adicionar.html')
+
+@bp.route('/categorias/editar/<int:id>', methods=['GET', 'POST'])
+@login_required
+def editar_categoria(id):
+    categoria = Categoria.query.get_or_404(id)
+    # Quantidade de produtos com um COUNT, sem carregar a coleção categoria.produtos
+    total_produtos = db.session.query(func.count(Produto.id)).filter(Produto.categoria_id == id).scalar()
+    
+    if request.method == 'POST':
+        nome = request.form.get('nome', '').strip()
+        
+        # Validação
+        errors = []
+        if not nome:
+            errors.append('O nome da categoria é obrigatório.')
+        elif len(nome) < 2:
+            errors.append('O nome da categoria deve ter pelo menos 2 caracteres.')
+        elif len(nome) > 50:
+            errors.append('O nome da categoria não pode ter mais de 50 caracteres.')
+        
+        # Verificar se já existe outra categoria com este nome
+        categoria_existente = Categoria.query.filter(func.lower(Categoria.nome) == func.lower(nome), Categoria.id != id).first()
+        if categoria_existente:
+            errors.append(f'Já existe uma categoria com o nome "{nome}".')
+        
+        if errors:
+            for error in errors:
+                flash(error, 'danger')
+            return render_template('categorias/editar.html', categoria={'id': id, 'nome': nome},
+                                   total_produtos=total_produtos)
+        
+        # Atualizar categoria
+        categoria.nome = nome
+        try:
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+            flash(f'Já existe uma categoria com o nome "{nome}".', 'danger')
+            return render_template('categorias/editar.html', categoria={'id': id, 'nome': nome},
+                                   total_produtos=total_produtos)
+        
+        flash(f'Categoria "{nome}" atualizada com sucesso!', 'success')
+        return redirect(url_for('categorias.listar_categorias'))
+    
+    return render_template('categorias/editar.html', categoria=categoria, total_produtos=total_produtos)
+
+@bp.route('/categorias/excluir/<int:id>', methods=['POST'])
+@login_required
+def excluir_categoria(id):
+    categoria = Categoria.query.get_or_404(id)
+    
+    # Verificar se existem produtos nesta categoria (sem carregar a coleção)
+    if db.session.query(Produto.query.filter_by(categoria_id=id).exists()).scalar():
+        flash(f'Não é possível excluir a categoria "{categoria.nome}" pois ela possui produtos vinculados.', 'danger')
+        return redirect(url_for('categorias.listar_categorias'))
+    
+    try:
+        nome_categoria = categoria.nome
+        db.session.delete(categoria)
+        db.session.commit()
+        flash(f'Categoria "{nome_categoria}" excluída com sucesso!', 'success')
+    except Exception as e:
+        db.session.rollback()
+        flash(f'Erro ao excluir a categoria: {str(e)}', 'danger')
+    
+    return redirect(url_for('categorias.listar_categorias'))
+
@@ -0,0 +1,409 @@
+"""Comandos da CLI (flask --app app <comando>)"""
+import csv
+import os
+import re
+import shutil
+import time
+import uuid
+from datetime import datetime, timedelta
+
+import click
+from flask import current_app
+from flask.cli import ScriptInfo, with_appcontext
+from sqlalchemy import delete, event, func, inspect
+from sqlalchemy.exc import OperationalError
+
+import imagens
+from .catalogo import (MARCA_AGREGADO, MARCA_LEITURA_COMPLETA, arquivo_referenciado, conteudo_em_uso, em_blocos,
+                       nomes_referenciados)
+from .extensoes import cache_fragmentos, db, fila
+from .modelos import Arquivo, Categoria, ItemCarrinho, Produto, User
+from .paginacao import POR_PAGINA_LOJA
+from .transferencia import IMPORTACAO_TAMANHO_LOTE, formato_importacao, importar_produtos
+from .uploads import imagem_original, processar_imagem
+
+# Migrações (flask db ...). O Flask-Migrate importa o alembic, que pesa uma boa
+# parte da inicialização; por isso só é carregado quando um desses comandos é usado.
+def iniciar_migracoes(app):
+    from flask_migrate import Migrate
+    if 'migrate' not in app.extensions:
+        Migrate(app, db)
+
+class GrupoMigracoes(click.Group):
+    """Grupo `db` que, ao ser usado, dá lugar ao grupo do Flask-Migrate"""
+    def make_context(self, info_name, args, parent=None, **extra):
+        from flask_migrate.cli import db as grupo
+        iniciar_migracoes(parent.ensure_object(ScriptInfo).load_app())
+        return grupo.make_context(info_name, args, parent=parent, **extra)
+
+migracoes = GrupoMigracoes('db', help='Migrações do banco de dados (Flask-Migrate).')
+
+# Criação das tabelas e do usuário admin. Fica fora da inicialização da
+# aplicação para que nenhum worker grave no banco (nem gere hash de senha) ao subir.
+@click.command('criar-banco')
+@click.option('--senha-admin', envvar='ADMIN_SENHA',
+              help='Senha do usuário admin, se ele ainda não existir (ou a variável ADMIN_SENHA).')
+@with_appcontext
+def criar_banco(senha_admin):
+    """Cria as tabelas que faltam e o usuário admin"""
+    banco_novo = not inspect(db.engine).get_table_names()
+    db.create_all()
+    if banco_novo:
+        # O esquema criado já é o das migrações mais recentes
+        from flask_migrate import stamp
+        iniciar_migracoes(current_app)
+        stamp()
+    os.makedirs(current_app.config['UPLOAD_FOLDER'], exist_ok=True)
+    click.echo('Tabelas criadas.')
+    # Adicionar um usuário admin se não existir
+    if not User.query.filter_by(username='admin').first():
+        if not senha_admin:
+            senha_admin = 'senha123'
+            click.echo('Aviso: usando a senha padrão do admin; troque-a ou use --senha-admin.', err=True)
+        admin = User(username='admin')
+        admin.set_password(senha_admin)
+        db.session.add(admin)
+        db.session.commit()
+        click.echo('Usuário admin criado')
+
+# Comandos para trocar a senha de um usuário e encerrar suas sessões. As sessões
+# abertas (em qualquer processo) deixam de valer assim que o commit termina.
+@click.command('alterar-senha')
+@click.argument('username')
+@click.password_option('--senha', help='Nova senha (pedida no terminal se omitida).')
+@with_appcontext
+def alterar_senha(username, senha):
+    """Troca a senha de USERNAME e encerra as sessões abertas dele"""
+    usuario = User.query.filter_by(username=username).first()
+    if usuario is None:
+        raise click.ClickException(f'Usuário {username} não encontrado.')
+    usuario.set_password(senha)
+    db.session.commit()
+    click.echo(f'Senha de {username} alterada; as sessões abertas foram encerradas.')
+
+@click.command('encerrar-sessoes')
+@click.argument('username')
+@with_appcontext
+def encerrar_sessoes(username):
+    """Encerra as sessões abertas de USERNAME sem trocar a senha"""
+    usuario = User.query.filter_by(username=username).first()
+    if usuario is None:
+        raise click.ClickException(f'Usuário {username} não encontrado.')
+    usuario.encerrar_sessoes()
+    db.session.commit()
+    click.echo(f'Sessões de {username} encerradas.')
+
+@click.command('processar-tarefas')
+@with_appcontext
+def processar_tarefas():
+    """Executa agora as tarefas pendentes da fila"""
+    fila.sincrona = True
+    total = fila.processar_pendentes()
+    click.echo(f'{total} tarefas processadas. Situação da fila: {fila.resumo()}')
+
+# Verificação dos planos de consulta das rotas (EXPLAIN QUERY PLAN).
+# Tabelas pequenas que algumas páginas leem por inteiro de propósito (menu e lista de categorias)
+VARREDURA_PERMITIDA = {'categoria'}
+
+def rotas_verificadas():
+    """Requisições que exercitam as consultas de cada rota sem gravar nada no banco"""
+    produto_id = db.session.query(func.min(Produto.id)).scalar() or 1
+    categoria_id = db.session.query(func.min(Categoria.id)).scalar() or 1
+    imagem_nome = db.session.query(func.min(Produto.imagem_nome)).scalar() or 'inexistente.jpg'
+    return [
+        ('GET', '/', None),
+        ('GET', f'/?categoria={categoria_id}', None),
+        ('GET', f'/?categoria={categoria_id}&apos={produto_id}', None),
+        ('GET', f'/?antes={produto_id + POR_PAGINA_LOJA}', None),
+        ('GET', f'/?categoria={categoria_id}&categoria={categoria_id + 1}&preco_min=50&preco_max=500&com_imagem=1', None),
+        ('GET', '/?com_imagem=1', None),
+        ('GET', '/?preco_min=50&preco_max=500', None),
+        ('GET', '/?faixa=2', None),
+        ('GET', '/?ordem=preco', None),
+        ('GET', f'/?ordem=preco_desc&categoria={categoria_id}', None),
+        ('GET', '/?ordem=nome', None),
+        ('GET', '/?ordem=recentes', None),
+        ('GET', '/buscar?q=cam', None),
+        ('GET', '/carrinho', None),
+        ('GET', f'/img/{imagem_nome}', None),
+        ('GET', '/listar_produtos', None),
+        ('GET', f'/listar_produtos?categoria={categoria_id}', None),
+        ('GET', '/listar_produtos?stream=1', None),
+        ('GET', f'/listar_produtos?stream=1&categoria={categoria_id}', None),
+        ('GET', f'/produto/{produto_id}', None),
+        ('GET', f'/editar/{produto_id}', None),
+        ('GET', '/adicionar', None),
+        ('GET', '/categorias', None),
+        ('GET', '/api/produtos?fields=nome,preco,categoria', None),
+        ('GET', f'/api/produtos?categoria={categoria_id}&apos={produto_id}', None),
+        ('GET', '/api/categorias', None),
+        ('GET', '/admin/export', None),
+        ('GET', f'/admin/export?format=jsonl&categoria={categoria_id}', None),
+        ('GET', f'/admin/export?format=csv&gzip=1&categoria={categoria_id}', None),
+        # POSTs inválidos: rodam as consultas de validação e voltam ao formulário
+        ('POST', '/categorias/adicionar', {'nome': 'x'}),
+        ('POST', f'/categorias/editar/{categoria_id}', {'nome': 'x'}),
+        ('POST', '/adicionar', {'nome': '', 'preco': '', 'categoria_id': str(categoria_id)}),
+    ]
+
+def normalizar_condicao(condicao):
+    """Condição SQL sem nomes de tabela, espaços e maiúsculas, para comparação"""
+    return re.sub(r'\s+', '', re.sub(r'\b\w+\.', '', condicao)).lower()
+
+def filtro_coberto(conexao, sql, linha):
+    """Indica se o WHERE da consulta não faz a varredura ler a tabela inteira: a consulta
+    não tem WHERE, ou o WHERE é exatamente a condição de um índice parcial. Se a varredura
+    não usa esse índice, foi o SQLite que o dispensou por a condição valer para a maioria
+    das linhas (com poucas linhas casando, ele passa a usar o índice)"""
+    where = re.search(r'\bWHERE\b(.*?)(?:\bGROUP BY\b|\bORDER BY\b|\bLIMIT\b|$)', sql, re.I | re.S)
+    if where is None:
+        return True
+    indice = re.search(r'USING (?:COVERING )?INDEX (\w+)', linha)
+    if indice is not None:
+        definicoes = conexao.exec_driver_sql(
+            "SELECT sql FROM sqlite_master WHERE type = 'index' AND name = ?", (indice.group(1),)).scalars()
+    elif re.fullmatch(r'SCAN \w+', linha):
+        definicoes = conexao.exec_driver_sql(
+            "SELECT sql FROM sqlite_master WHERE type = 'index' AND tbl_name = ?", (linha.split()[1],)).scalars()
+    else:
+        return False
+    for definicao in definicoes:
+        parcial = re.search(r'\bWHERE\b(.*)$', definicao or '', re.I | re.S)
+        if parcial is not None and normalizar_condicao(parcial.group(1)) == normalizar_condicao(where.group(1)):
+            return True
+    return False
+
+def analisar_plano(conexao, sql, parametros):
+    """Retorna (linhas do plano, varreduras completas encontradas)"""
+    plano = [linha[-1] for linha in conexao.exec_driver_sql('EXPLAIN QUERY PLAN ' + sql, parametros)]
+    # Agregados que leem o catálogo inteiro de propósito (ex.: contagens das facetas, guardadas no cache)
+    if MARCA_AGREGADO in sql:
+        return plano, []
+    # Uma varredura na ordem do ORDER BY (sem TEMP B-TREE) interrompida pelo LIMIT não
+    # lê a tabela inteira, desde que nenhum filtro descarte linhas no caminho: com
+    # filtro, ela pode percorrer a tabela toda até encher a página
+    limitada = re.search(r'\bLIMIT\b', sql, re.I) and not any('TEMP B-TREE' in linha for linha in plano)
+    # As leituras completas marcadas podem varrer a tabela, desde que também não descartem linhas
+    completa = MARCA_LEITURA_COMPLETA in sql
+    varreduras = []
+    for linha in plano:
+        encontrada = re.match(r'SCAN (\w+)', linha)
+        if not encontrada or 'VIRTUAL TABLE' in linha:
+            continue
+        if (limitada or completa) and filtro_coberto(conexao, sql, linha):
+            continue
+        if encontrada.group(1) not in VARREDURA_PERMITIDA:
+            varreduras.append(linha)
+    return plano, varreduras
+
+@click.command('verificar-planos')
+@with_appcontext
+@click.option('--verbose', '-v', is_flag=True, help='Mostra o plano de todas as consultas.')
+def verificar_planos(verbose):
+    """Falha se alguma consulta das rotas fizer varredura completa de tabela"""
+    if db.engine.dialect.name != 'sqlite':
+        raise click.ClickException('A verificação usa EXPLAIN QUERY PLAN do SQLite.')
+    
+    admin = User.query.filter_by(username='admin').first()
+    rotas = rotas_verificadas()
+    cliente = current_app.test_client()
+    with cliente.session_transaction() as sessao:
+        if admin:
+            sessao['_user_id'] = admin.get_id()
+        sessao['carrinho_token'] = uuid.uuid4().hex
+    
+    capturadas = []
+    def capturar(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith(('SELECT', 'WITH')):
+            capturadas.append((statement, parameters))
+    
+    problemas = 0
+    for metodo, url, dados in rotas:
+        cache_fragmentos.limpar()  # sem cache, para que as consultas realmente aconteçam
+        capturadas.clear()
+        event.listen(db.engine, 'before_cursor_execute', capturar)
+        try:
+            resposta = cliente.open(url, method=metodo, data=dados)
+            # As respostas em streaming só consultam o banco enquanto o corpo é gerado
+            resposta.get_data()
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', capturar)
+        
+        click.echo(f'{metodo} {url} -> {resposta.status_code} ({len(capturadas)} consultas)')
+        with db.engine.connect() as conexao:
+            for sql, parametros in capturadas:
+                plano, varreduras = analisar_plano(conexao, sql, parametros)
+                if varreduras:
+                    problemas += len(varreduras)
+                    click.echo(f'  VARREDURA COMPLETA: {" ".join(sql.split())}')
+                if varreduras or verbose:
+                    for linha in plano:
+                        click.echo(f'    {linha}')
+    
+    if problemas:
+        raise click.ClickException(f'{problemas} varredura(s) completa(s) de tabela encontradas.')
+    click.echo('Nenhuma varredura completa de tabela encontrada.')
+
+# Comando para apagar carrinhos abandonados
+@click.command('limpar-carrinhos')
+@with_appcontext
+@click.option('--dias', default=30, show_default=True, help='Idade mínima (sem alterações) do carrinho.')
+def limpar_carrinhos(dias):
+    """Remove os itens de carrinhos sem alterações há mais de N dias"""
+    limite = datetime.utcnow() - timedelta(days=dias)
+    removidos = db.session.execute(delete(ItemCarrinho).where(ItemCarrinho.atualizado_em < limite)).rowcount
+    db.session.commit()
+    click.echo(f'{removidos} itens de carrinho removidos.')
+
+# Coleta de lixo do diretório de uploads: apaga (ou move para quarentena) os
+# arquivos que nenhum produto referencia, como sobras de uploads cujo commit
+# falhou ou de remoções que não concluíram.
+@click.command('limpar-uploads')
+@with_appcontext
+@click.option('--carencia', default=24.0, show_default=True,
+              help='Idade mínima (horas) de um arquivo sem referência para ser removido.')
+@click.option('--dry-run', is_flag=True, help='Apenas relata o que seria removido.')
+@click.option('--quarentena', type=click.Path(file_okay=False),
+              help='Move os arquivos órfãos para este diretório em vez de apagá-los.')
+@click.option('--verbose', '-v', is_flag=True, help='Lista cada arquivo órfão e cada imagem ausente.')
+def limpar_uploads(carencia, dry_run, quarentena, verbose):
+    """Remove os arquivos de upload que nenhum produto referencia"""
+    pasta = current_app.config['UPLOAD_FOLDER']
+    referenciados = nomes_referenciados()
+    # Variantes são comparadas pelo nome do original, sem a extensão
+    bases_referenciadas = {nome.rsplit('.', 1)[0] for nome in referenciados}
+    limite = time.time() - carencia * 3600
+    if quarentena and not dry_run:
+        os.makedirs(quarentena, exist_ok=True)
+    
+    arquivos = bytes_total = recentes = 0
+    orfaos = []
+    bytes_orfaos = 0
+    encontrados = set()
+    with os.scandir(pasta) as entradas:
+        for entrada in entradas:
+            if not entrada.is_file(follow_symlinks=False):
+                continue
+            info = entrada.stat(follow_symlinks=False)
+            arquivos += 1
+            bytes_total += info.st_size
+            original = imagem_original(entrada.name)
+            if original == entrada.name:
+                if entrada.name in referenciados:
+                    encontrados.add(entrada.name)
+                    continue
+            elif original in bases_referenciadas:
+                continue
+            if info.st_mtime > limite:
+                recentes += 1  # pode ser um upload em andamento
+                continue
+            if verbose:
+                click.echo(f'Órfão: {entrada.name} ({info.st_size} bytes)')
+            bytes_orfaos += info.st_size
+            if dry_run:
+                orfaos.append(entrada.name)
+                continue
+            try:
+                # Confere de novo logo antes de apagar: um upload pode ter reaproveitado
+                # o arquivo (save_image atualiza a data) depois da leitura das referências
+                em_uso = arquivo_referenciado(entrada.name) if original == entrada.name else conteudo_em_uso(original)
+                if em_uso or os.stat(entrada.path).st_mtime > limite:
+                    bytes_orfaos -= info.st_size
+                    recentes += 1
+                    continue
+                if quarentena:
+                    shutil.move(entrada.path, os.path.join(quarentena, entrada.name))
+                else:
+                    os.remove(entrada.path)
+                orfaos.append(entrada.name)
+            except OSError:
+                bytes_orfaos -= info.st_size
+                current_app.logger.exception('Erro ao remover o arquivo órfão %s', entrada.name)
+    
+    # Registros de arquivos sem referências que acabaram de ser removidos
+    if orfaos and not dry_run:
+        for bloco in em_blocos(orfaos):
+            db.session.execute(delete(Arquivo).where(Arquivo.nome.in_(bloco), Arquivo.referencias <= 0))
+        db.session.commit()
+    
+    ausentes = referenciados - encontrados
+    if verbose:
+        for nome in sorted(ausentes):
+            click.echo(f'Ausente: {nome}')
+    acao = 'seriam removidos' if dry_run else ('movidos para quarentena' if quarentena else 'removidos')
+    click.echo(f'{arquivos} arquivos ({bytes_total} bytes) em {pasta}.')
+    click.echo(f'{len(orfaos)} arquivos órfãos {acao}: {bytes_orfaos} bytes recuperados'
+               f'{" (simulação)" if dry_run else ""}.')
+    click.echo(f'{recentes} arquivos sem referência mantidos por serem mais novos que {carencia:g}h.')
+    if ausentes:
+        click.echo(f'{len(ausentes)} imagens referenciadas não existem no disco (use -v para listar).')
+
+# Comando para importar produtos de um arquivo CSV/JSONL de qualquer tamanho
+@click.command('importar-produtos')
+@with_appcontext
+@click.argument('arquivo', type=click.File('r', encoding='utf-8-sig', lazy=False))
+@click.option('--formato', type=click.Choice(['csv', 'jsonl']), help='Padrão: deduzido pela extensão.')
+@click.option('--lote', default=IMPORTACAO_TAMANHO_LOTE, show_default=True, help='Registros por transação.')
+@click.option('--criar-categorias', is_flag=True, help='Cria as categorias que ainda não existem.')
+@click.option('--relatorio', type=click.File('w', encoding='utf-8'),
+              help='Grava os registros rejeitados (linha, erro) neste arquivo CSV.')
+def importar_produtos_cli(arquivo, formato, lote, criar_categorias, relatorio):
+    """Importa produtos de ARQUIVO ('-' lê da entrada padrão)"""
+    formato = formato_importacao(arquivo.name, formato)
+    if not formato:
+        raise click.ClickException('Informe o formato com --formato (csv ou jsonl).')
+    
+    if relatorio:
+        escritor = csv.writer(relatorio)
+        escritor.writerow(['linha', 'erro'])
+        def registrar_erro(linha, mensagens):
+            escritor.writerow([linha, ' '.join(mensagens)])
+    else:
+        def registrar_erro(linha, mensagens):
+            click.echo(f'Linha {linha}: {" ".join(mensagens)}', err=True)
+    
+    def lote_gravado(resumo):
+        click.echo(f'{resumo["linhas"]} registros lidos, {resumo["importados"]} importados, '
+                   f'{resumo["erros"]} com erro...')
+    
+    try:
+        resumo = importar_produtos(arquivo, formato, tamanho_lote=lote, criar_categorias=criar_categorias,
+                                   registrar_erro=registrar_erro, lote_gravado=lote_gravado)
+    except OperationalError as e:
+        raise click.ClickException(f'Importação interrompida por um erro do banco: {e.orig}. '
+                                   'Os lotes informados acima já foram gravados.')
+    click.echo(f'Concluído: {resumo["importados"]} de {resumo["linhas"]} produtos importados '
+               f'({resumo["erros"]} com erro).')
+
+# Comando para gerar as variantes das imagens já existentes
+@click.command('gerar-miniaturas')
+@with_appcontext
+@click.option('--todas', is_flag=True, help='Regera também as imagens que já possuem variantes.')
+def gerar_miniaturas(todas):
+    """Gera as variantes (thumb/card/detail) das imagens já enviadas"""
+    if not imagens.disponivel():
+        raise click.ClickException('Pillow não está instalado.')
+    query = Produto.query.filter(Produto.imagem_nome.isnot(None))
+    if not todas:
+        query = query.filter(Produto.imagem_variantes.is_(None))
+    total = 0
+    ultimo_id = 0
+    while True:
+        # Processa em lotes pelo id para não carregar o catálogo inteiro
+        lote = query.filter(Produto.id > ultimo_id).order_by(Produto.id).limit(100).all()
+        if not lote:
+            break
+        for produto in lote:
+            processar_imagem(produto)
+        db.session.commit()
+        ultimo_id = lote[-1].id
+        total += len(lote)
+        click.echo(f'{total} imagens processadas...')
+    click.echo(f'Concluído: {total} imagens processadas.')
+
+COMANDOS = (migracoes, criar_banco, alterar_senha, encerrar_sessoes, processar_tarefas, verificar_planos,
+            limpar_carrinhos, limpar_uploads, importar_produtos_cli, gerar_miniaturas)
+
+def init_app(app):
+    for comando in COMANDOS:
+        app.cli.add_command(comando)
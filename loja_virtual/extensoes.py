@@ -0,0 +1,38 @@
+"""Extensões e serviços compartilhados, criados sem aplicação e ligados a ela em create_app()"""
+import importlib
+
+from flask_login import LoginManager
+from flask_sqlalchemy import SQLAlchemy
+
+from cache import CacheLRU
+from compressao import Compressao
+from fila import FilaTarefas
+from perf import Instrumentacao
+
+db = SQLAlchemy()
+login_manager = LoginManager()
+
+def insert_com_conflito():
+    """insert() do dialeto em uso, com on_conflict_do_update, ou None se ele não tiver
+    INSERT ... ON CONFLICT (só SQLite e PostgreSQL). O módulo do dialeto já foi
+    carregado pela engine; importá-lo aqui evita carregar o do PostgreSQL à toa."""
+    if db.engine.dialect.name not in ('sqlite', 'postgresql'):
+        return None
+    return importlib.import_module(f'sqlalchemy.dialects.{db.engine.dialect.name}').insert
+login_manager.login_view = 'auth.login'  # Rota para onde redirecionar se não autenticado
+
+# Fila para o processamento de imagens fora da thread da requisição.
+# É iniciada na primeira tarefa enfileirada e drenada quando o processo termina.
+fila = FilaTarefas()
+
+# Cache de fragmentos da loja. As chaves incluem a versão do catálogo, que muda
+# a cada commit que altera Produto ou Categoria (em qualquer processo).
+cache_fragmentos = CacheLRU()
+
+# Usuários das sessões (ver usuarios.py), para que @login_required não consulte o banco
+cache_usuarios = CacheLRU()
+
+instrumentacao = Instrumentacao()
+
+# Compressão gzip/brotli e minificação das respostas (ver COMPRESSAO_* em config.py)
+compressao = Compressao()
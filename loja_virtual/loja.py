@@ -0,0 +1,156 @@
+"""Loja: vitrine, busca, imagens públicas e carrinho"""
+import mimetypes
+import os
+
+from flask import Blueprint, abort, current_app, flash, redirect, render_template, request, send_from_directory, url_for
+from markupsafe import Markup
+from werkzeug.security import safe_join
+
+from .carrinho import QUANTIDADE_MAXIMA, carrinho_backend, precificar_carrinho, token_carrinho
+from .catalogo import (ORDENS_LOJA, buscar_produtos, consulta_produtos, facetas_loja, filtrar_produtos,
+                       ler_filtros_loja, parametros_filtros, versao_catalogo)
+from .extensoes import cache_fragmentos, db
+from .modelos import Categoria, Produto
+from .paginacao import POR_PAGINA_LOJA, ler_inteiro, ler_por_pagina, paginar_keyset, paginar_ordenado
+from .uploads import NOME_POR_CONTEUDO
+
+bp = Blueprint('loja', __name__)
+
+# Rota da loja com filtros (categorias, faixa de preço, com imagem) e ordenação
+@bp.route('/')
+def loja():
+    filtros = ler_filtros_loja(request.args)
+    query = filtrar_produtos(consulta_produtos(), filtros)
+    
+    # Sem ordem escolhida, pagina pelo id (cursores inteiros); com ordem, pelo
+    # valor da coluna mais o id (cursores opacos)
+    if filtros.ordem:
+        apos = request.args.get('apos') or None
+        antes = request.args.get('antes') or None
+    else:
+        apos = ler_inteiro('apos')
+        antes = ler_inteiro('antes')
+    por_pagina = ler_por_pagina(POR_PAGINA_LOJA)
+    versao = versao_catalogo()
+    
+    # Grade de produtos (apenas a página atual) e facetas vêm do cache
+    # enquanto o catálogo não for alterado
+    def renderizar_grade():
+        if filtros.ordem:
+            coluna, decrescente = ORDENS_LOJA[filtros.ordem]
+            produtos = paginar_ordenado(query, coluna, Produto.id, decrescente,
+                                        apos=apos, antes=antes, por_pagina=por_pagina)
+        else:
+            produtos = paginar_keyset(query, Produto.id, apos=apos, antes=antes, por_pagina=por_pagina)
+        # Os links da paginação vêm dos filtros normalizados, que fazem parte da
+        # chave do cache, e não da query string de quem preencheu o cache
+        parametros = parametros_filtros(filtros)
+        if por_pagina != POR_PAGINA_LOJA:
+            parametros['por_pagina'] = por_pagina
+        return Markup(render_template('_grade_produtos.html', produtos=produtos, parametros=parametros))
+    
+    grade_produtos = cache_fragmentos.obter_ou_calcular(
+        ('grade', versao, filtros, apos, antes, por_pagina), renderizar_grade)
+    facetas = Markup(render_template('_facetas.html', filtros=filtros,
+                                     facetas=facetas_loja(versao, filtros)))
+    
+    # Quantidade de itens no carrinho (sem carregar os produtos)
+    total_itens = carrinho_backend().total_itens(token_carrinho())
+    
+    return render_template('loja.html', 
+                          grade_produtos=grade_produtos, 
+                          facetas=facetas,
+                          total_itens=total_itens)
+
+def renderizar_menu_categorias(versao, categoria_atual):
+    """Menu de categorias da loja, guardado no cache de fragmentos"""
+    return cache_fragmentos.obter_ou_calcular(
+        ('menu', versao, categoria_atual),
+        lambda: Markup(render_template('_menu_categorias.html',
+                                       categorias=Categoria.query.all(),
+                                       categoria_atual=categoria_atual)))
+
+# Rota de busca textual de produtos
+@bp.route('/buscar')
+def buscar():
+    termos = request.args.get('q', '').strip()
+    if not termos:
+        return redirect(url_for('loja.loja'))
+    
+    por_pagina = ler_por_pagina(POR_PAGINA_LOJA)
+    produtos = buscar_produtos(termos, apos=request.args.get('apos') or None,
+                               antes=request.args.get('antes') or None, por_pagina=por_pagina)
+    parametros = {'q': termos}
+    if por_pagina != POR_PAGINA_LOJA:
+        parametros['por_pagina'] = por_pagina
+    grade_produtos = Markup(render_template('_grade_produtos.html', produtos=produtos,
+                                            endpoint='loja.buscar', parametros=parametros))
+    menu_categorias = renderizar_menu_categorias(versao_catalogo(), None)
+    
+    total_itens = carrinho_backend().total_itens(token_carrinho())
+    
+    return render_template('loja.html', 
+                          grade_produtos=grade_produtos, 
+                          menu_categorias=menu_categorias,
+                          total_itens=total_itens,
+                          categoria_atual=None,
+                          busca=termos)
+
+# Rota pública para as imagens: sem login e sem sessão, com cache HTTP
+@bp.route('/img/<filename>')
+def imagem_publica(filename):
+    caminho = safe_join(current_app.config['UPLOAD_FOLDER'], filename)
+    if caminho is None or not os.path.isfile(caminho):
+        return 'Imagem não encontrada', 404
+    
+    por_conteudo = NOME_POR_CONTEUDO.match(filename)
+    max_age = 365 * 24 * 60 * 60 if por_conteudo else current_app.config['IMAGENS_MAX_AGE']
+    if current_app.config['UPLOADS_X_ACCEL']:
+        # O nginx envia o arquivo (e trata ETag/If-Modified-Since) a partir de uma location interna
+        response = current_app.response_class(mimetype=mimetypes.guess_type(filename)[0] or 'application/octet-stream')
+        response.headers['X-Accel-Redirect'] = current_app.config['UPLOADS_X_ACCEL'].rstrip('/') + '/' + filename
+    else:
+        # Para arquivos por conteúdo o próprio hash é um ETag forte;
+        # send_from_directory responde 304 a If-None-Match / If-Modified-Since
+        etag = por_conteudo.group(0) if por_conteudo else True
+        response = send_from_directory(current_app.config['UPLOAD_FOLDER'], filename, etag=etag, max_age=max_age)
+    
+    response.cache_control.public = True
+    response.cache_control.max_age = max_age
+    if por_conteudo:
+        response.cache_control.immutable = True
+    return response
+
+# Rota para adicionar ao carrinho
+@bp.route('/adicionar_carrinho/<int:produto_id>', methods=['POST'])
+def adicionar_carrinho(produto_id):
+    produto = db.session.query(Produto.nome, Produto.preco).filter_by(id=produto_id).first()
+    if produto is None:
+        abort(404)
+    nome_produto = produto.nome
+    quantidade = max(1, min(ler_inteiro('quantidade', 1, origem=request.form), QUANTIDADE_MAXIMA))
+    
+    # Somar ao item existente ou adicionar um novo
+    if carrinho_backend().adicionar(token_carrinho(criar=True), produto_id, quantidade, produto.preco):
+        flash(f'Quantidade de {nome_produto} atualizada no carrinho!', 'success')
+    else:
+        flash(f'{nome_produto} adicionado ao carrinho!', 'success')
+    
+    return redirect(url_for('loja.loja'))
+
+# Rota para visualizar carrinho
+@bp.route('/carrinho')
+def ver_carrinho():
+    # Preços atuais de todos os itens em uma única consulta
+    carrinho, total = precificar_carrinho(carrinho_backend().itens(token_carrinho()))
+    total_itens = sum(linha.quantidade for linha in carrinho)
+    
+    return render_template('carrinho.html', carrinho=carrinho, total=total, total_itens=total_itens)
+
+# Rota para esvaziar o carrinho
+@bp.route('/esvaziar_carrinho', methods=['POST'])
+def esvaziar_carrinho():
+    carrinho_backend().esvaziar(token_carrinho())
+    flash('Carrinho esvaziado com sucesso!', 'success')
+    return redirect(url_for('loja.ver_carrinho'))
+
@@ -0,0 +1,182 @@
+"""Modelos do banco de dados"""
+from datetime import datetime
+from functools import lru_cache
+
+from flask import current_app
+from flask_login import UserMixin
+from sqlalchemy import DDL, event, func
+from werkzeug.security import generate_password_hash, check_password_hash
+
+import imagens
+from .extensoes import db
+from .uploads import url_imagem
+
+# Modelo de Categoria
+class Categoria(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    nome = db.Column(db.String(50), nullable=False, unique=True)
+    
+    # Relacionamento com produtos (um para muitos)
+    produtos = db.relationship('Produto', backref='categoria', lazy=True)
+    
+    def __repr__(self):
+        return f'<Categoria {self.nome}>'
+
+# Índice para a verificação de nome duplicado sem diferenciar maiúsculas
+db.Index('ix_categoria_nome_lower', func.lower(Categoria.nome))
+
+# Modelo de Produto com relacionamento com categoria e imagem
+class Produto(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    nome = db.Column(db.String(100), nullable=False)
+    preco = db.Column(db.Float, nullable=False)
+    descricao = db.Column(db.Text, nullable=True)
+    
+    # Campos para imagem
+    imagem_nome = db.Column(db.String(255), nullable=True)
+    imagem_data = db.Column(db.DateTime, default=datetime.utcnow)
+    # {tamanho: largura} das variantes geradas (ver imagens.TAMANHOS). none_as_null: sem
+    # variantes, a coluna fica NULL (e não o JSON 'null'), para o filtro do gerar-miniaturas
+    imagem_variantes = db.Column(db.JSON(none_as_null=True), nullable=True)
+    
+    # Chave estrangeira para Categoria
+    categoria_id = db.Column(db.Integer, db.ForeignKey('categoria.id'), nullable=True)
+    
+    __table_args__ = (
+        # Filtro por categoria paginado pelo id (loja e listar_produtos) e contagem por categoria
+        db.Index('ix_produto_categoria_id_id', 'categoria_id', 'id'),
+        # Ordenações da loja (preço, nome, mais recentes); o id entra no índice como desempate
+        db.Index('ix_produto_preco', 'preco'),
+        db.Index('ix_produto_nome', 'nome'),
+        db.Index('ix_produto_imagem_data', 'imagem_data'),
+        # As mesmas ordenações dentro de uma categoria: sem a categoria na frente do
+        # índice, o SQLite percorre o índice da ordenação inteiro filtrando linha a linha
+        db.Index('ix_produto_categoria_id_preco', 'categoria_id', 'preco', 'id'),
+        db.Index('ix_produto_categoria_id_nome', 'categoria_id', 'nome', 'id'),
+        db.Index('ix_produto_categoria_id_imagem_data', 'categoria_id', 'imagem_data', 'id'),
+        # Produtos que compartilham um arquivo de imagem
+        db.Index('ix_produto_imagem_nome', 'imagem_nome'),
+        # Loja filtrada por "com imagem" e paginada pelo id (índice parcial)
+        db.Index('ix_produto_com_imagem', 'id',
+                 sqlite_where=db.text('imagem_nome IS NOT NULL'),
+                 postgresql_where=db.text('imagem_nome IS NOT NULL')),
+    )
+    
+    def __repr__(self):
+        return f'<Produto {self.nome}>'
+        
+    @property
+    def imagem_url(self):
+        """Retorna a URL da imagem do produto"""
+        if self.imagem_nome:
+            return url_imagem(self.imagem_nome)
+        return None
+
+    def imagem_variante_url(self, tamanho, extensao='jpg'):
+        """Retorna a URL da variante pedida, ou da maior disponível abaixo dela"""
+        if not self.imagem_nome:
+            return None
+        variantes = self.imagem_variantes or {}
+        candidatos = [t for t in imagens.TAMANHOS if t in variantes
+                      and imagens.TAMANHOS[t] <= imagens.TAMANHOS[tamanho]]
+        if not candidatos:
+            return self.imagem_url
+        return url_imagem(imagens.nome_variante(self.imagem_nome, candidatos[-1], extensao))
+
+    def imagem_srcset(self, extensao='jpg'):
+        """Retorna o atributo srcset com todas as variantes geradas da imagem"""
+        variantes = self.imagem_variantes or {}
+        return ', '.join(
+            f'{url_imagem(imagens.nome_variante(self.imagem_nome, tamanho, extensao))} {largura}w'
+            for tamanho, largura in variantes.items()
+        )
+
+# Modelo de arquivo enviado: as imagens são gravadas pelo hash do conteúdo,
+# então imagens idênticas ocupam um único arquivo, compartilhado por todos
+# os produtos que a usam. O arquivo só é apagado quando não há mais referências.
+class Arquivo(db.Model):
+    nome = db.Column(db.String(255), primary_key=True)
+    tamanho = db.Column(db.Integer, nullable=True)
+    referencias = db.Column(db.Integer, nullable=False, default=0)
+    criado_em = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<Arquivo {self.nome} ({self.referencias} refs)>'
+
+# Modelo de item do carrinho: o carrinho fica no servidor, identificado por um
+# token guardado na sessão. A chave primária (token, produto_id) permite achar
+# um item diretamente. Além de id e quantidade, guarda o preço visto pelo cliente
+# ao adicionar o item, para avisá-lo se o preço mudou depois.
+class ItemCarrinho(db.Model):
+    __tablename__ = 'item_carrinho'
+    token = db.Column(db.String(32), primary_key=True)
+    produto_id = db.Column(db.Integer, db.ForeignKey('produto.id', ondelete='CASCADE'), primary_key=True)
+    quantidade = db.Column(db.Integer, nullable=False, default=1)
+    preco_referencia = db.Column(db.Float, nullable=True)
+    atualizado_em = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<ItemCarrinho {self.token}:{self.produto_id} x{self.quantidade}>'
+
+# Índice de busca textual (SQLite FTS5) sobre nome e descrição dos produtos.
+# O tokenizador remove acentos ("calcado" encontra "Calçado") e os índices de
+# prefixo aceleram buscas parciais ("cam*"). Os triggers mantêm o índice em
+# sincronia com qualquer INSERT/UPDATE/DELETE na tabela produto.
+PRODUTO_FTS_DDL = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS produto_fts USING fts5(
+        nome, descricao,
+        content='produto', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2',
+        prefix='2 3'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS produto_fts_ai AFTER INSERT ON produto BEGIN
+        INSERT INTO produto_fts(rowid, nome, descricao) VALUES (new.id, new.nome, new.descricao);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS produto_fts_ad AFTER DELETE ON produto BEGIN
+        INSERT INTO produto_fts(produto_fts, rowid, nome, descricao) VALUES ('delete', old.id, old.nome, old.descricao);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS produto_fts_au AFTER UPDATE OF nome, descricao ON produto BEGIN
+        INSERT INTO produto_fts(produto_fts, rowid, nome, descricao) VALUES ('delete', old.id, old.nome, old.descricao);
+        INSERT INTO produto_fts(rowid, nome, descricao) VALUES (new.id, new.nome, new.descricao);
+    END""",
+]
+
+for ddl in PRODUTO_FTS_DDL:
+    event.listen(Produto.__table__, 'after_create', DDL(ddl).execute_if(dialect='sqlite'))
+
+@lru_cache(maxsize=None)
+def prefixo_hash(metodo):
+    """Prefixo dos hashes gerados pelo método, com os parâmetros padrão explícitos
+    (ex.: 'scrypt' -> 'scrypt:32768:8:1')"""
+    return generate_password_hash('', method=metodo).split('$', 1)[0]
+
+# Modelo de usuário para autenticação
+class User(UserMixin, db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    username = db.Column(db.String(100), unique=True, nullable=False)
+    password_hash = db.Column(db.String(200), nullable=False)
+    # Faz parte do id guardado na sessão; incrementá-la encerra as sessões abertas
+    sessao_versao = db.Column(db.Integer, nullable=False, default=1, server_default='1')
+    
+    def get_id(self):
+        return f'{self.id}:{self.sessao_versao or 1}'
+    
+    def set_password(self, password):
+        self.atualizar_hash(password)
+        if self.id is not None:
+            self.encerrar_sessoes()
+        
+    def check_password(self, password):
+        return check_password_hash(self.password_hash, password)
+    
+    def atualizar_hash(self, password):
+        """Gera o hash com o método de SENHA_METODO, sem encerrar as sessões"""
+        self.password_hash = generate_password_hash(password, method=current_app.config['SENHA_METODO'])
+    
+    def hash_desatualizado(self):
+        """Indica se o hash foi gerado com um método diferente do configurado"""
+        return self.password_hash.split('$', 1)[0] != prefixo_hash(current_app.config['SENHA_METODO'])
+    
+    def encerrar_sessoes(self):
+        """Invalida as sessões já abertas deste usuário (vale após o commit)"""
+        self.sessao_versao = (self.sessao_versao or 1) + 1
@@ -0,0 +1,148 @@
+"""Paginação por cursor (keyset) das listagens"""
+import base64
+import json
+import math
+from datetime import datetime
+
+from flask import request
+from sqlalchemy import DateTime, String, and_, or_, tuple_
+
+# Tamanhos de página
+POR_PAGINA_LOJA = 24
+POR_PAGINA_ADMIN = 50
+POR_PAGINA_MAXIMO = 100
+
+class Pagina:
+    """Resultado de uma consulta paginada por cursor"""
+    def __init__(self, itens, anterior, proximo, por_pagina):
+        self.itens = itens
+        self.anterior = anterior  # cursor para a página anterior (usar em ?antes=)
+        self.proximo = proximo    # cursor para a próxima página (usar em ?apos=)
+        self.por_pagina = por_pagina
+
+    def __iter__(self):
+        return iter(self.itens)
+
+    def __len__(self):
+        return len(self.itens)
+
+def ler_inteiro(nome, padrao=None, origem=None):
+    """Lê um parâmetro inteiro da query string (ou de origem, ex.: request.form), ignorando valores inválidos"""
+    valor = (request.args if origem is None else origem).get(nome)
+    if valor is None or valor == '':
+        return padrao
+    try:
+        return int(valor)
+    except ValueError:
+        return padrao
+
+def ler_por_pagina(padrao):
+    """Lê o tamanho da página da query string respeitando o limite máximo"""
+    por_pagina = ler_inteiro('por_pagina', padrao)
+    return max(1, min(por_pagina, POR_PAGINA_MAXIMO))
+
+def paginar_keyset(query, coluna, apos=None, antes=None, por_pagina=POR_PAGINA_LOJA):
+    """Pagina uma consulta usando uma coluna única e crescente como cursor.
+
+    Diferente de OFFSET, o custo de cada página não depende da posição
+    no catálogo e os cursores continuam válidos quando novos registros
+    são inseridos.
+    """
+    if antes is not None:
+        # Voltando: busca em ordem decrescente e inverte o resultado
+        itens = query.filter(coluna < antes).order_by(coluna.desc()).limit(por_pagina + 1).all()
+        ha_mais = len(itens) > por_pagina
+        itens = list(reversed(itens[:por_pagina]))
+        anterior = getattr(itens[0], coluna.key) if ha_mais else None
+        proximo = getattr(itens[-1], coluna.key) if itens else None
+    else:
+        if apos is not None:
+            query = query.filter(coluna > apos)
+        itens = query.order_by(coluna).limit(por_pagina + 1).all()
+        ha_mais = len(itens) > por_pagina
+        itens = itens[:por_pagina]
+        proximo = getattr(itens[-1], coluna.key) if ha_mais else None
+        anterior = getattr(itens[0], coluna.key) if apos is not None and itens else None
+    return Pagina(itens, anterior, proximo, por_pagina)
+
+
+# Paginação ordenada por outra coluna (preço, nome, data): o cursor leva o valor
+# da coluna e o id do último item, que desempata valores repetidos
+def codificar_cursor(valor, id):
+    if isinstance(valor, datetime):
+        valor = valor.isoformat()
+    return base64.urlsafe_b64encode(json.dumps([valor, id]).encode()).decode().rstrip('=')
+
+def decodificar_cursor(cursor, coluna):
+    """Retorna (valor, id) do cursor, ou None se ele for inválido (a listagem volta à primeira página).
+
+    O cursor vem da query string: além do JSON, confere se os tipos batem com a coluna.
+    """
+    if not cursor:
+        return None
+    try:
+        valor, id = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        if isinstance(id, bool) or not isinstance(id, int):
+            return None
+        if valor is None:
+            return (valor, id) if coluna.expression.nullable else None
+        if isinstance(coluna.type, (DateTime, String)):
+            if not isinstance(valor, str):
+                return None
+            if isinstance(coluna.type, DateTime):
+                valor = datetime.fromisoformat(valor)
+        elif isinstance(valor, bool) or not isinstance(valor, (int, float)) or not math.isfinite(valor):
+            return None
+        return valor, id
+    except (ValueError, TypeError):
+        return None
+
+def depois_do_cursor(coluna, desempate, valor, id, decrescente):
+    """Condição dos itens posteriores a (valor, id) na ordem (coluna, desempate)"""
+    if not coluna.expression.nullable:
+        # Comparação de tuplas: aproveita o índice da coluna (que inclui o id)
+        if decrescente:
+            return tuple_(coluna, desempate) < tuple_(valor, id)
+        return tuple_(coluna, desempate) > tuple_(valor, id)
+    # No SQLite, NULL vem antes de qualquer valor em ordem crescente e depois em decrescente
+    if decrescente:
+        if valor is None:
+            return and_(coluna.is_(None), desempate < id)
+        return or_(coluna < valor, and_(coluna == valor, desempate < id), coluna.is_(None))
+    if valor is None:
+        return or_(and_(coluna.is_(None), desempate > id), coluna.isnot(None))
+    return or_(coluna > valor, and_(coluna == valor, desempate > id))
+
+def paginar_ordenado(query, coluna, desempate, decrescente=False, apos=None, antes=None,
+                     por_pagina=POR_PAGINA_LOJA):
+    """Como paginar_keyset, mas ordenando por uma coluna que pode repetir valores.
+
+    Os cursores (apos/antes) são textos opacos gerados por codificar_cursor.
+    """
+    def ordem(invertida):
+        if decrescente != invertida:
+            return coluna.desc(), desempate.desc()
+        return coluna.asc(), desempate.asc()
+
+    def cursor(item):
+        return codificar_cursor(getattr(item, coluna.key), getattr(item, desempate.key))
+
+    cursor_antes = decodificar_cursor(antes, coluna)
+    cursor_apos = decodificar_cursor(apos, coluna)
+    if cursor_antes is not None:
+        # Voltando: busca na ordem inversa e inverte o resultado
+        itens = query.filter(depois_do_cursor(coluna, desempate, *cursor_antes, not decrescente)) \
+            .order_by(*ordem(True)).limit(por_pagina + 1).all()
+        ha_mais = len(itens) > por_pagina
+        itens = list(reversed(itens[:por_pagina]))
+        anterior = cursor(itens[0]) if ha_mais else None
+        proximo = cursor(itens[-1]) if itens else None
+    else:
+        if cursor_apos is not None:
+            query = query.filter(depois_do_cursor(coluna, desempate, *cursor_apos, decrescente))
+        itens = query.order_by(*ordem(False)).limit(por_pagina + 1).all()
+        ha_mais = len(itens) > por_pagina
+        itens = itens[:por_pagina]
+        proximo = cursor(itens[-1]) if ha_mais else None
+        anterior = cursor(itens[0]) if cursor_apos is not None and itens else None
+    return Pagina(itens, anterior, proximo, por_pagina)
@@ -0,0 +1,175 @@
+"""Importação e exportação do catálogo em CSV ou JSONL"""
+import csv
+import io
+import json
+import zlib
+
+from sqlalchemy import insert
+from sqlalchemy.exc import DataError, IntegrityError
+
+from .catalogo import validar_produto
+from .extensoes import db
+from .modelos import Categoria, Produto
+
+# Importação de produtos em massa (CSV ou JSONL). O arquivo é lido registro a
+# registro e gravado em lotes (um INSERT executemany e um commit por lote), então
+# a memória usada não depende do tamanho do arquivo.
+IMPORTACAO_TAMANHO_LOTE = 1000
+IMPORTACAO_MAX_ERROS_EXIBIDOS = 100
+FORMATOS_IMPORTACAO = {'csv': 'csv', 'jsonl': 'jsonl', 'ndjson': 'jsonl', 'json': 'jsonl'}
+# Erros do banco causados pelo próprio registro, informados como erro da sua linha
+ERROS_DE_REGISTRO = (IntegrityError, DataError)
+
+def formato_importacao(nome_arquivo, formato=None):
+    """Formato informado ou deduzido pela extensão do arquivo (None se desconhecido)"""
+    if formato:
+        return FORMATOS_IMPORTACAO.get(formato.lower())
+    if '.' in nome_arquivo:
+        return FORMATOS_IMPORTACAO.get(nome_arquivo.rsplit('.', 1)[1].lower())
+    return None
+
+def ler_registros_importacao(arquivo, formato):
+    """Gera (número da linha, registro, erro) para cada registro do arquivo de texto"""
+    if formato == 'csv':
+        leitor = csv.DictReader(arquivo)
+        for registro in leitor:
+            yield leitor.line_num, registro, None
+        return
+    for numero, linha in enumerate(arquivo, 1):
+        if not linha.strip():
+            continue
+        try:
+            registro = json.loads(linha)
+        except ValueError as e:
+            yield numero, None, f'JSON inválido: {e}'
+            continue
+        if not isinstance(registro, dict):
+            yield numero, None, 'Cada linha deve conter um objeto JSON.'
+            continue
+        yield numero, registro, None
+
+def texto_campo(registro, campo):
+    valor = registro.get(campo)
+    return '' if valor is None else str(valor).strip()
+
+def importar_produtos(arquivo, formato, tamanho_lote=IMPORTACAO_TAMANHO_LOTE, criar_categorias=False,
+                      registrar_erro=None, lote_gravado=None):
+    """Importa os produtos do arquivo e retorna {'linhas', 'importados', 'erros'}.
+    
+    Colunas/chaves aceitas: nome, preco, descricao e categoria (pelo nome) ou
+    categoria_id. As regras de validação são as mesmas dos formulários.
+    registrar_erro(linha, erros) é chamada para cada registro rejeitado e
+    lote_gravado(resumo) após o commit de cada lote.
+    """
+    # Categorias são poucas: um mapa nome -> id evita uma consulta por registro
+    categorias = {nome.lower(): id for id, nome in db.session.query(Categoria.id, Categoria.nome)}
+    ids_categorias = set(categorias.values())
+    resumo = {'linhas': 0, 'importados': 0, 'erros': 0}
+    lote = []
+    
+    def gravar_lote():
+        # Cada item do lote é (número da linha, valores). O lote vai em um único
+        # INSERT; se o banco recusar algum registro, os do lote são gravados um a
+        # um e os recusados são informados como erros da sua linha. Outros erros
+        # do banco (ex.: "database is locked") não são culpa dos registros:
+        # interrompem a importação em vez de descartar o lote
+        try:
+            if lote:
+                try:
+                    with db.session.begin_nested():
+                        db.session.execute(insert(Produto), [valores for _, valores in lote])
+                    resumo['importados'] += len(lote)
+                except ERROS_DE_REGISTRO:
+                    for numero, valores in lote:
+                        try:
+                            with db.session.begin_nested():
+                                db.session.execute(insert(Produto), [valores])
+                            resumo['importados'] += 1
+                        except ERROS_DE_REGISTRO as e:
+                            resumo['erros'] += 1
+                            if registrar_erro:
+                                registrar_erro(numero, [f'Erro ao gravar no banco: {e.orig}'])
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        lote.clear()
+        if lote_gravado:
+            lote_gravado(resumo)
+    
+    for numero, registro, erro in ler_registros_importacao(arquivo, formato):
+        resumo['linhas'] += 1
+        errors = [erro] if erro else []
+        if not erro:
+            nome = texto_campo(registro, 'nome')
+            descricao = texto_campo(registro, 'descricao')
+            preco, errors = validar_produto(nome, texto_campo(registro, 'preco'), descricao)
+            
+            categoria_id = None
+            categoria_nome = texto_campo(registro, 'categoria')
+            categoria_id_str = texto_campo(registro, 'categoria_id')
+            if categoria_nome:
+                categoria_id = categorias.get(categoria_nome.lower())
+                if categoria_id is None and criar_categorias and 2 <= len(categoria_nome) <= 50:
+                    nova_categoria = Categoria(nome=categoria_nome)
+                    db.session.add(nova_categoria)
+                    db.session.flush()
+                    categoria_id = categorias[categoria_nome.lower()] = nova_categoria.id
+                    ids_categorias.add(categoria_id)
+                elif categoria_id is None:
+                    errors.append(f'A categoria "{categoria_nome}" não existe.')
+            elif categoria_id_str:
+                try:
+                    categoria_id = int(categoria_id_str)
+                except ValueError:
+                    categoria_id = None
+                if categoria_id not in ids_categorias:
+                    errors.append('A categoria selecionada não existe.')
+        
+        if errors:
+            resumo['erros'] += 1
+            if registrar_erro:
+                registrar_erro(numero, errors)
+            continue
+        
+        lote.append((numero, {'nome': nome, 'preco': preco, 'descricao': descricao, 'categoria_id': categoria_id}))
+        if len(lote) >= tamanho_lote:
+            gravar_lote()
+    
+    gravar_lote()
+    return resumo
+
+# Exportação do catálogo. As linhas são lidas do banco em blocos (yield_per) e
+# enviadas à medida que são geradas, então a memória não cresce com o catálogo.
+EXPORTACAO_BLOCO_LINHAS = 1000
+EXPORTACAO_BLOCO_BYTES = 64 * 1024
+# Mesmos nomes de campos aceitos pela importação
+CAMPOS_EXPORTACAO = ['id', 'nome', 'preco', 'descricao', 'categoria_id', 'categoria', 'imagem_nome']
+
+def gerar_exportacao(consulta, formato):
+    """Gera o conteúdo do arquivo exportado em blocos de texto"""
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer)
+    if formato == 'csv':
+        escritor.writerow(CAMPOS_EXPORTACAO)
+    for linha in db.session.execute(consulta.execution_options(yield_per=EXPORTACAO_BLOCO_LINHAS)):
+        if formato == 'csv':
+            escritor.writerow(linha)
+        else:
+            buffer.write(json.dumps(dict(zip(CAMPOS_EXPORTACAO, linha)), ensure_ascii=False))
+            buffer.write('\n')
+        if buffer.tell() >= EXPORTACAO_BLOCO_BYTES:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+def comprimir_gzip(partes):
+    """Comprime em gzip um gerador de blocos de texto, sem juntá-los em memória"""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for parte in partes:
+        comprimido = compressor.compress(parte.encode('utf-8'))
+        if comprimido:
+            yield comprimido
+    yield compressor.flush()
+
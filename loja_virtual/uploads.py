@@ -0,0 +1,120 @@
+"""Arquivos enviados: gravação pelo hash do conteúdo, variantes e URLs públicas"""
+import hashlib
+import os
+import re
+import time
+import uuid
+
+from flask import current_app
+
+import imagens
+
+ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif'}
+# Grafias da mesma extensão: o nome do arquivo vem do conteúdo, então o mesmo
+# conteúdo deve sempre gerar o mesmo nome (e as mesmas variantes)
+EXTENSOES_EQUIVALENTES = {'jpeg': 'jpg'}
+
+# Funções auxiliares para upload de arquivos
+def allowed_file(filename):
+    """Verifica se o arquivo tem uma extensão permitida"""
+    return '.' in filename and \
+           filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
+
+def save_image(file):
+    """Salva a imagem com o nome derivado do hash do conteúdo e retorna esse nome.
+
+    Se um arquivo com o mesmo conteúdo já existir, ele é reaproveitado.
+    """
+    if file and allowed_file(file.filename):
+        # A extensão já foi validada por allowed_file (secure_filename descartaria
+        # o ponto de nomes como ".png")
+        extensao = file.filename.rsplit('.', 1)[1].lower()
+        extensao = EXTENSOES_EQUIVALENTES.get(extensao, extensao)
+        # O diretório é criado no primeiro upload, não ao iniciar a aplicação
+        os.makedirs(current_app.config['UPLOAD_FOLDER'], exist_ok=True)
+        # Gravar em um arquivo temporário calculando o hash em blocos
+        temp_path = os.path.join(current_app.config['UPLOAD_FOLDER'], f".tmp_{uuid.uuid4().hex}")
+        sha256 = hashlib.sha256()
+        with open(temp_path, 'wb') as destino:
+            while True:
+                bloco = file.stream.read(64 * 1024)
+                if not bloco:
+                    break
+                sha256.update(bloco)
+                destino.write(bloco)
+        
+        filename = f"{sha256.hexdigest()}.{extensao}"
+        file_path = os.path.join(current_app.config['UPLOAD_FOLDER'], filename)
+        if os.path.exists(file_path):
+            os.remove(temp_path)
+            # Reaproveitado: a data nova protege o arquivo de remoções já agendadas
+            # (tarefa remover_imagens e carência do limpar-uploads)
+            os.utime(file_path)
+        else:
+            os.replace(temp_path, file_path)
+        return filename
+    return None
+
+
+def processar_imagem(produto):
+    """Gera as variantes redimensionadas da imagem do produto.
+
+    Só os erros permanentes (imagem ausente ou inválida) são tratados aqui; os
+    demais chegam à fila, que tenta a tarefa de novo.
+    """
+    if not produto.imagem_nome:
+        produto.imagem_variantes = None
+        return
+    try:
+        produto.imagem_variantes = imagens.gerar_variantes(current_app.config['UPLOAD_FOLDER'], produto.imagem_nome) or None
+    except imagens.ERROS_PERMANENTES:
+        current_app.logger.exception('Imagem %s inválida, variantes não geradas', produto.imagem_nome)
+        produto.imagem_variantes = None
+
+def remover_imagem(imagem_nome, variantes=True):
+    """Remove a imagem original e suas variantes do diretório de uploads.
+
+    variantes=False mantém as variantes, que são compartilhadas por todos os
+    arquivos com o mesmo conteúdo (ex.: <hash>.jpeg enviado antes da
+    normalização das extensões e <hash>.jpg).
+    """
+    nomes = [imagem_nome] + (imagens.nomes_variantes(imagem_nome) if variantes else [])
+    for nome in nomes:
+        try:
+            caminho = os.path.join(current_app.config['UPLOAD_FOLDER'], nome)
+            if os.path.exists(caminho):
+                os.remove(caminho)
+        except OSError:
+            # O arquivo que sobrar é recolhido pelo comando limpar-uploads
+            current_app.logger.exception('Erro ao excluir imagem %s', nome)
+
+
+# Arquivos gravados ou reaproveitados há menos que isso (segundos) não são apagados
+# pela tarefa remover_imagens; se ficarem órfãos, o limpar-uploads os recolhe
+ARQUIVO_RECENTE = 60
+
+def arquivo_recente(imagem_nome):
+    """Indica se o arquivo foi gravado ou reaproveitado por um upload recente"""
+    try:
+        modificado = os.path.getmtime(os.path.join(current_app.config['UPLOAD_FOLDER'], imagem_nome))
+    except OSError:
+        return False
+    return modificado > time.time() - ARQUIVO_RECENTE
+
+
+# Nomes derivados do hash do conteúdo (e suas variantes) nunca mudam de conteúdo
+NOME_POR_CONTEUDO = re.compile(r'^([0-9a-f]{64})(__\w+)?\.\w+$')
+
+def url_imagem(filename):
+    """URL pública de um arquivo de upload"""
+    return f"{current_app.config['IMAGENS_URL_BASE']}/img/{filename}"
+
+
+def imagem_original(nome):
+    """Nome da imagem original a que um arquivo pertence (o próprio nome se não for variante)"""
+    base, _, extensao = nome.rpartition('.')
+    if '__' in base:
+        base, tamanho = base.rsplit('__', 1)
+        if tamanho in imagens.TAMANHOS and extensao in imagens.FORMATOS:
+            return base
+    return nome
@@ -0,0 +1,46 @@
+"""Usuários autenticados: cache por processo do usuário de cada sessão.
+
+As rotas com @login_required carregam o usuário a cada requisição (inclusive as
+imagens de /uploads). Com o cache, só a primeira requisição de cada usuário
+consulta o banco. O id guardado na sessão inclui User.sessao_versao, então
+trocar a senha (ou encerrar as sessões) invalida os cookies já emitidos.
+"""
+from flask_login import UserMixin
+
+from .extensoes import cache_usuarios, db
+from .modelos import User
+from .versoes import registrar_versao
+
+
+class UsuarioSessao(UserMixin):
+    """Dados do usuário logado guardados no cache (sem vínculo com a sessão do banco)"""
+    def __init__(self, id, username, sessao_versao):
+        self.id = id
+        self.username = username
+        self.sessao_versao = sessao_versao
+
+    def get_id(self):
+        return f'{self.id}:{self.sessao_versao}'
+
+
+# A versão dos usuários muda a cada commit que altera um User (em qualquer processo)
+versao_usuarios, invalidar_usuarios = registrar_versao((User,), 'USUARIOS_VERSAO_ARQUIVO', cache_usuarios)
+
+def carregar_usuario(user_id):
+    """Usuário da sessão, ou None se ele não existe mais ou a sessão foi encerrada"""
+    try:
+        id, versao = (int(parte) for parte in user_id.split(':'))
+    except ValueError:
+        return None  # sessão criada antes do id com versão: pede um novo login
+    # A versão do arquivo entra na chave: uma alteração em outro processo invalida o cache
+    chave = (id, versao_usuarios())
+    usuario = cache_usuarios.obter(chave)
+    if usuario is None:
+        linha = db.session.query(User.id, User.username, User.sessao_versao).filter_by(id=id).first()
+        if linha is None:
+            return None
+        usuario = UsuarioSessao(*linha)
+        cache_usuarios.guardar(chave, usuario)
+    if usuario.sessao_versao != versao:
+        return None
+    return usuario
@@ -0,0 +1,56 @@
+"""Versões de dados guardadas na data de modificação de um arquivo.
+
+Cada commit que altera um dos modelos registrados toca o arquivo, e a data
+dele entra nas chaves do cache correspondente: assim todos os processos
+percebem uma alteração feita por qualquer um deles. O cache local é
+descartado na hora.
+"""
+import os
+
+from flask import current_app
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+
+def registrar_versao(modelos, chave_config, cache):
+    """Liga a versão do arquivo em app.config[chave_config] aos commits que alteram
+    os modelos; retorna as funções (versao, invalidar)"""
+    modelos = tuple(modelos)
+    marca = f'alterado:{chave_config}'
+
+    def versao():
+        """Versão atual (data de modificação do arquivo de versão)"""
+        try:
+            return os.stat(current_app.config[chave_config]).st_mtime_ns
+        except FileNotFoundError:
+            return 0
+
+    def invalidar():
+        """Descarta o cache local e avisa os outros processos"""
+        cache.limpar()
+        caminho = current_app.config[chave_config]
+        with open(caminho, 'a'):
+            os.utime(caminho)
+
+    @event.listens_for(Session, 'before_flush')
+    def marcar_alteracao(sessao, flush_context, instances):
+        if any(isinstance(obj, modelos) for obj in (*sessao.new, *sessao.dirty, *sessao.deleted)):
+            sessao.info[marca] = True
+
+    @event.listens_for(Session, 'do_orm_execute')
+    def marcar_alteracao_em_lote(estado):
+        # INSERT/UPDATE/DELETE em lote não passam pelo flush
+        if (estado.is_insert or estado.is_update or estado.is_delete) and estado.bind_mapper \
+                and estado.bind_mapper.class_ in modelos:
+            estado.session.info[marca] = True
+
+    @event.listens_for(Session, 'after_commit')
+    def invalidar_apos_commit(sessao):
+        if sessao.info.pop(marca, False):
+            invalidar()
+
+    @event.listens_for(Session, 'after_rollback')
+    def descartar_marcacao(sessao):
+        sessao.info.pop(marca, None)
+
+    return versao, invalidar
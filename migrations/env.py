@@ -51,6 +51,15 @@ def get_metadata():
     return target_db.metadata
 
 
+# The FTS5 search index (produto_fts and its shadow tables produto_fts_data,
+# _idx, _docsize and _config) is created by raw DDL, not by the models, so
+# autogenerate must not propose dropping it
+def include_object(object, name, type_, reflected, compare_to):
+    if type_ == 'table' and name.startswith('produto_fts'):
+        return False
+    return True
+
+
 def run_migrations_offline():
     """Run migrations in 'offline' mode.
 
@@ -65,7 +74,8 @@ def run_migrations_offline():
     """
     url = config.get_main_option("sqlalchemy.url")
     context.configure(
-        url=url, target_metadata=get_metadata(), literal_binds=True
+        url=url, target_metadata=get_metadata(), literal_binds=True,
+        include_object=include_object
     )
 
     with context.begin_transaction():
@@ -93,6 +103,7 @@ def run_migrations_online():
     conf_args = current_app.extensions['migrate'].configure_args
     if conf_args.get("process_revision_directives") is None:
         conf_args["process_revision_directives"] = process_revision_directives
+    conf_args.setdefault("include_object", include_object)
 
     connectable = get_engine()
 
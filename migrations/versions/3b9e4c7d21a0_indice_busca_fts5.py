@@ -0,0 +1,57 @@
+"""Indice de busca FTS5 para produtos
+
+Revision ID: 3b9e4c7d21a0
+Revises: f557b7e9826c
+Create Date: 2025-04-02 10:12:31.512044
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3b9e4c7d21a0'
+down_revision = 'f557b7e9826c'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # FTS5 só existe no SQLite; nos outros bancos buscar_produtos usa uma busca simples pelo nome
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    op.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS produto_fts USING fts5(
+            nome, descricao,
+            content='produto', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2',
+            prefix='2 3'
+        )
+    """)
+    op.execute("""
+        CREATE TRIGGER IF NOT EXISTS produto_fts_ai AFTER INSERT ON produto BEGIN
+            INSERT INTO produto_fts(rowid, nome, descricao) VALUES (new.id, new.nome, new.descricao);
+        END
+    """)
+    op.execute("""
+        CREATE TRIGGER IF NOT EXISTS produto_fts_ad AFTER DELETE ON produto BEGIN
+            INSERT INTO produto_fts(produto_fts, rowid, nome, descricao) VALUES ('delete', old.id, old.nome, old.descricao);
+        END
+    """)
+    op.execute("""
+        CREATE TRIGGER IF NOT EXISTS produto_fts_au AFTER UPDATE OF nome, descricao ON produto BEGIN
+            INSERT INTO produto_fts(produto_fts, rowid, nome, descricao) VALUES ('delete', old.id, old.nome, old.descricao);
+            INSERT INTO produto_fts(rowid, nome, descricao) VALUES (new.id, new.nome, new.descricao);
+        END
+    """)
+    # Indexar os produtos já existentes
+    op.execute("INSERT INTO produto_fts(produto_fts) VALUES ('rebuild')")
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    op.execute("DROP TRIGGER IF EXISTS produto_fts_au")
+    op.execute("DROP TRIGGER IF EXISTS produto_fts_ad")
+    op.execute("DROP TRIGGER IF EXISTS produto_fts_ai")
+    op.execute("DROP TABLE IF EXISTS produto_fts")
@@ -0,0 +1,33 @@
+"""Indices da ordenacao da loja
+
+Revision ID: 4f8a2c6e1d93
+Revises: b6d41f2e8c57
+Create Date: 2025-04-15 09:41:17.203518
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4f8a2c6e1d93'
+down_revision = 'b6d41f2e8c57'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # IF NOT EXISTS: os índices podem já ter sido criados pelo comando criar-banco (db.create_all())
+    op.execute("CREATE INDEX IF NOT EXISTS ix_produto_nome ON produto (nome)")
+    op.execute("CREATE INDEX IF NOT EXISTS ix_produto_imagem_data ON produto (imagem_data)")
+    op.execute("CREATE INDEX IF NOT EXISTS ix_produto_categoria_id_preco ON produto (categoria_id, preco, id)")
+    op.execute("CREATE INDEX IF NOT EXISTS ix_produto_categoria_id_nome ON produto (categoria_id, nome, id)")
+    op.execute("CREATE INDEX IF NOT EXISTS ix_produto_categoria_id_imagem_data ON produto (categoria_id, imagem_data, id)")
+
+
+def downgrade():
+    op.execute("DROP INDEX IF EXISTS ix_produto_categoria_id_imagem_data")
+    op.execute("DROP INDEX IF EXISTS ix_produto_categoria_id_nome")
+    op.execute("DROP INDEX IF EXISTS ix_produto_categoria_id_preco")
+    op.execute("DROP INDEX IF EXISTS ix_produto_imagem_data")
+    op.execute("DROP INDEX IF EXISTS ix_produto_nome")
@@ -0,0 +1,27 @@
+"""Variantes vazias como NULL
+
+Revision ID: 6a9d3f0b7e28
+Revises: 9c3e5a7b2f41
+Create Date: 2025-04-17 10:12:36.540281
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6a9d3f0b7e28'
+down_revision = '9c3e5a7b2f41'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Antes de none_as_null, atribuir None gravava o JSON 'null' em vez de NULL,
+    # e o comando gerar-miniaturas (que procura NULL) não voltava a esses produtos
+    op.execute("UPDATE produto SET imagem_variantes = NULL WHERE CAST(imagem_variantes AS TEXT) = 'null'")
+
+
+def downgrade():
+    # NULL e 'null' são lidos da mesma forma; não há o que desfazer
+    pass
@@ -0,0 +1,25 @@
+"""Indice parcial dos produtos com imagem
+
+Revision ID: 9c3e5a7b2f41
+Revises: 4f8a2c6e1d93
+Create Date: 2025-04-16 11:05:42.918337
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9c3e5a7b2f41'
+down_revision = '4f8a2c6e1d93'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # IF NOT EXISTS: o índice pode já ter sido criado pelo comando criar-banco (db.create_all())
+    op.execute("CREATE INDEX IF NOT EXISTS ix_produto_com_imagem ON produto (id) WHERE imagem_nome IS NOT NULL")
+
+
+def downgrade():
+    op.execute("DROP INDEX IF EXISTS ix_produto_com_imagem")
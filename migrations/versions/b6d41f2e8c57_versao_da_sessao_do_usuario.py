@@ -0,0 +1,33 @@
+"""Versao da sessao do usuario
+
+Revision ID: b6d41f2e8c57
+Revises: e93b5f0c7a14
+Create Date: 2025-04-14 10:12:05.641872
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b6d41f2e8c57'
+down_revision = 'e93b5f0c7a14'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # A tabela user é criada pelo comando criar-banco (db.create_all()), que já inclui a coluna
+    inspetor = sa.inspect(op.get_bind())
+    if not inspetor.has_table('user'):
+        return
+    if 'sessao_versao' in [coluna['name'] for coluna in inspetor.get_columns('user')]:
+        return
+
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('sessao_versao', sa.Integer(), nullable=False, server_default='1'))
+
+
+def downgrade():
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.drop_column('sessao_versao')
@@ -0,0 +1,31 @@
+"""Indices dos filtros mais usados
+
+Revision ID: e93b5f0c7a14
+Revises: a7c3d18e6f25
+Create Date: 2025-04-11 16:22:48.377105
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e93b5f0c7a14'
+down_revision = 'a7c3d18e6f25'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # IF NOT EXISTS: os índices podem já ter sido criados pelo comando criar-banco (db.create_all())
+    op.execute("CREATE INDEX IF NOT EXISTS ix_produto_categoria_id_id ON produto (categoria_id, id)")
+    op.execute("CREATE INDEX IF NOT EXISTS ix_produto_preco ON produto (preco)")
+    op.execute("CREATE INDEX IF NOT EXISTS ix_produto_imagem_nome ON produto (imagem_nome)")
+    op.execute("CREATE INDEX IF NOT EXISTS ix_categoria_nome_lower ON categoria (lower(nome))")
+
+
+def downgrade():
+    op.execute("DROP INDEX IF EXISTS ix_categoria_nome_lower")
+    op.execute("DROP INDEX IF EXISTS ix_produto_imagem_nome")
+    op.execute("DROP INDEX IF EXISTS ix_produto_preco")
+    op.execute("DROP INDEX IF EXISTS ix_produto_categoria_id_id")
@@ -0,0 +1,200 @@
+"""Instrumentação por requisição: tempo total, tempo e quantidade de consultas SQL,
+consultas repetidas, tempo de renderização dos templates e bytes enviados.
+
+Os números de cada requisição vão para o cabeçalho Server-Timing (visível nas
+ferramentas do navegador) e para um buffer circular em memória, de onde saem os
+percentis por endpoint. Opcionalmente, uma amostra das requisições roda sob o
+cProfile e as lentas têm o perfil gravado em disco (.prof, para snakeviz,
+flameprof ou pstats).
+"""
+import cProfile
+import math
+import os
+import random
+import re
+import threading
+import time
+from collections import Counter, deque
+
+from flask import g, has_request_context, request, template_rendered, before_render_template
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+def percentil(valores_ordenados, p):
+    """Percentil pelo método do posto mais próximo (valores já ordenados)"""
+    if not valores_ordenados:
+        return None
+    posicao = max(0, math.ceil(p / 100 * len(valores_ordenados)) - 1)
+    return valores_ordenados[posicao]
+
+
+class Instrumentacao:
+    """Coleta as métricas das requisições de uma aplicação Flask"""
+
+    def __init__(self, app=None, tamanho_buffer=5000, amostragem_perfil=0.0, limite_lento=0.5,
+                 pasta_perfis=None):
+        self.tamanho_buffer = tamanho_buffer
+        self.amostragem_perfil = amostragem_perfil  # fração das requisições executadas sob o cProfile
+        self.limite_lento = limite_lento            # segundos; perfis mais rápidos são descartados
+        self.pasta_perfis = pasta_perfis
+        self.ativa = False
+        self._registros = deque(maxlen=tamanho_buffer)
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.tamanho_buffer = app.config.get('PERF_BUFFER', self.tamanho_buffer)
+        self.amostragem_perfil = app.config.get('PERF_AMOSTRAGEM_PERFIL', self.amostragem_perfil)
+        self.limite_lento = app.config.get('PERF_LIMITE_LENTO', self.limite_lento)
+        self.pasta_perfis = app.config.get('PERF_PASTA_PERFIS') or self.pasta_perfis \
+            or os.path.join(app.instance_path, 'perfis')
+        self._registros = deque(maxlen=self.tamanho_buffer)
+
+        app.before_request(self._iniciar)
+        app.after_request(self._concluir)
+        app.teardown_request(self._encerrar_perfil)
+        # Vale para todas as engines (a da aplicação e as criadas depois)
+        if not event.contains(Engine, 'before_cursor_execute', self._antes_consulta):
+            event.listen(Engine, 'before_cursor_execute', self._antes_consulta)
+            event.listen(Engine, 'after_cursor_execute', self._depois_consulta)
+        before_render_template.connect(self._antes_template, app)
+        template_rendered.connect(self._depois_template, app)
+        self.ativa = True
+
+    # Estado da requisição atual (None fora de uma requisição, ex.: comandos da CLI)
+    def _estado(self):
+        if has_request_context():
+            return g.get('_perf')
+        return None
+
+    def _iniciar(self):
+        g._perf = {
+            'inicio': time.perf_counter(),
+            'sql_tempo': 0.0,
+            'consultas': Counter(),
+            'template_tempo': 0.0,
+            'templates_abertos': [],
+            'perfil': None,
+        }
+        if self.amostragem_perfil and random.random() < self.amostragem_perfil:
+            perfil = cProfile.Profile()
+            try:
+                perfil.enable()
+            except ValueError:  # outro perfilador já ativo nesta thread
+                return
+            g._perf['perfil'] = perfil
+
+    def _antes_consulta(self, conn, cursor, statement, parameters, context, executemany):
+        if self._estado() is not None:
+            conn.info.setdefault('_perf_inicio', []).append(time.perf_counter())
+
+    def _depois_consulta(self, conn, cursor, statement, parameters, context, executemany):
+        estado = self._estado()
+        if estado is None or not conn.info.get('_perf_inicio'):
+            return
+        estado['sql_tempo'] += time.perf_counter() - conn.info['_perf_inicio'].pop()
+        # A mesma instrução com os mesmos parâmetros mais de uma vez é uma consulta repetida
+        estado['consultas'][(statement, repr(parameters))] += 1
+
+    def _antes_template(self, sender, template, context, **extra):
+        estado = self._estado()
+        if estado is not None:
+            estado['templates_abertos'].append(time.perf_counter())
+
+    def _depois_template(self, sender, template, context, **extra):
+        estado = self._estado()
+        if estado is None or not estado['templates_abertos']:
+            return
+        inicio = estado['templates_abertos'].pop()
+        # Templates renderizados dentro de outro já entram no tempo do externo
+        if not estado['templates_abertos']:
+            estado['template_tempo'] += time.perf_counter() - inicio
+
+    def _concluir(self, response):
+        estado = self._estado()
+        if estado is None:
+            return response
+        duracao = time.perf_counter() - estado['inicio']
+        consultas = sum(estado['consultas'].values())
+        repetidas = sum(total - 1 for total in estado['consultas'].values() if total > 1)
+        registro = {
+            'endpoint': request.endpoint or '<404>',
+            'metodo': request.method,
+            'status': response.status_code,
+            'duracao': duracao,
+            'sql_tempo': estado['sql_tempo'],
+            'consultas': consultas,
+            'repetidas': repetidas,
+            'template_tempo': estado['template_tempo'],
+            # Respostas em streaming não têm tamanho conhecido neste ponto
+            'bytes': None if response.is_streamed else response.calculate_content_length(),
+            'quando': time.time(),
+        }
+        with self._lock:
+            self._registros.append(registro)
+
+        response.headers.add('Server-Timing', ', '.join([
+            f'app;dur={duracao * 1000:.1f}',
+            f'sql;dur={estado["sql_tempo"] * 1000:.1f};desc="{consultas} consultas, {repetidas} repetidas"',
+            f'tpl;dur={estado["template_tempo"] * 1000:.1f}',
+        ]))
+        self._salvar_perfil(estado, registro)
+        return response
+
+    def _salvar_perfil(self, estado, registro):
+        perfil = estado.pop('perfil', None)
+        if perfil is None:
+            return
+        perfil.disable()
+        if registro['duracao'] < self.limite_lento:
+            return
+        os.makedirs(self.pasta_perfis, exist_ok=True)
+        endpoint = re.sub(r'[^\w.-]', '_', registro['endpoint'])
+        nome = f'{time.strftime("%Y%m%d-%H%M%S")}_{endpoint}_{registro["duracao"] * 1000:.0f}ms.prof'
+        perfil.dump_stats(os.path.join(self.pasta_perfis, nome))
+
+    def _encerrar_perfil(self, erro):
+        # Requisições interrompidas por exceção não passam pelo after_request
+        estado = self._estado()
+        if estado is not None and estado.get('perfil') is not None:
+            estado.pop('perfil').disable()
+
+    def registros(self):
+        with self._lock:
+            return list(self._registros)
+
+    def limpar(self):
+        with self._lock:
+            self._registros.clear()
+
+    def resumo(self):
+        """Percentis (ms) e médias por endpoint das requisições no buffer"""
+        por_endpoint = {}
+        for registro in self.registros():
+            por_endpoint.setdefault(registro['endpoint'], []).append(registro)
+
+        endpoints = {}
+        for endpoint, registros in sorted(por_endpoint.items()):
+            duracoes = sorted(r['duracao'] * 1000 for r in registros)
+            total = len(registros)
+            tamanhos = [r['bytes'] for r in registros if r['bytes'] is not None]
+            endpoints[endpoint] = {
+                'requisicoes': total,
+                'p50_ms': round(percentil(duracoes, 50), 2),
+                'p95_ms': round(percentil(duracoes, 95), 2),
+                'p99_ms': round(percentil(duracoes, 99), 2),
+                'max_ms': round(duracoes[-1], 2),
+                'sql_ms_medio': round(sum(r['sql_tempo'] for r in registros) * 1000 / total, 2),
+                'consultas_media': round(sum(r['consultas'] for r in registros) / total, 2),
+                'repetidas_max': max(r['repetidas'] for r in registros),
+                'template_ms_medio': round(sum(r['template_tempo'] for r in registros) * 1000 / total, 2),
+                'bytes_medio': round(sum(tamanhos) / len(tamanhos)) if tamanhos else None,
+            }
+        return {
+            'ativa': self.ativa,
+            'buffer': self.tamanho_buffer,
+            'requisicoes': sum(e['requisicoes'] for e in endpoints.values()),
+            'endpoints': endpoints,
+        }
@@ -0,0 +1,34 @@
+"""Aplicação de teste com um banco SQLite temporário e um cliente logado como admin"""
+import pytest
+
+from loja_virtual import create_app
+from loja_virtual.extensoes import cache_usuarios, db
+from loja_virtual.modelos import User
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + str(tmp_path / 'loja.db'),
+        'UPLOAD_FOLDER': str(tmp_path / 'uploads'),
+        'CATALOGO_VERSAO_ARQUIVO': str(tmp_path / 'catalogo.versao'),
+        'USUARIOS_VERSAO_ARQUIVO': str(tmp_path / 'usuarios.versao'),
+        'FILA_DB': str(tmp_path / 'fila.db'),
+    })
+    with app.app_context():
+        db.create_all()
+        admin = User(username='admin')
+        admin.set_password('senha123')
+        db.session.add(admin)
+        db.session.commit()
+        yield app
+        db.session.remove()
+    cache_usuarios.limpar()
+
+
+@pytest.fixture
+def cliente(app):
+    cliente = app.test_client()
+    with cliente.session_transaction() as sessao:
+        sessao['_user_id'] = User.query.filter_by(username='admin').one().get_id()
+    return cliente
@@ -0,0 +1,17 @@
+"""Contagem de referências dos arquivos de upload"""
+from loja_virtual.catalogo import referenciar_arquivo
+from loja_virtual.extensoes import db
+from loja_virtual.modelos import Arquivo
+
+
+def test_referenciar_arquivo_cria_e_soma_referencias(app):
+    referenciar_arquivo('abc.jpg')
+    db.session.commit()
+    # Já existe: o INSERT ... ON CONFLICT soma a referência em vez de falhar
+    referenciar_arquivo('abc.jpg')
+    db.session.commit()
+
+    arquivo = db.session.get(Arquivo, 'abc.jpg')
+    assert arquivo.referencias == 2
+    assert arquivo.criado_em is not None
+
@@ -0,0 +1,36 @@
+"""Busca textual paginada por cursor (relevância, id)"""
+from loja_virtual.catalogo import buscar_produtos
+from loja_virtual.extensoes import db
+from loja_virtual.modelos import Produto
+
+
+def popular_busca():
+    # Relevâncias diferentes (descrições de tamanhos variados) e repetidas (mesmo texto)
+    db.session.add_all(Produto(nome=f'Camisa {numero}', preco=10, descricao='algodão ' * (numero % 4))
+                       for numero in range(25))
+    db.session.add(Produto(nome='Caneca', preco=5, descricao=''))
+    db.session.commit()
+
+
+def test_busca_percorre_todas_as_paginas_nos_dois_sentidos(app):
+    popular_busca()
+    paginas = [buscar_produtos('camisa', por_pagina=10)]
+    while paginas[-1].proximo is not None:
+        paginas.append(buscar_produtos('camisa', apos=paginas[-1].proximo, por_pagina=10))
+
+    nomes = [produto.nome for pagina in paginas for produto in pagina]
+    assert [len(pagina) for pagina in paginas] == [10, 10, 5]
+    assert sorted(nomes) == sorted(f'Camisa {numero}' for numero in range(25))
+    assert paginas[0].anterior is None
+
+    # Voltando a partir da última página, as páginas são as mesmas
+    volta = buscar_produtos('camisa', antes=paginas[2].anterior, por_pagina=10)
+    assert [p.id for p in volta] == [p.id for p in paginas[1]]
+
+
+def test_pagina_da_busca_tem_links_com_os_termos(app, cliente):
+    popular_busca()
+    html = cliente.get('/buscar?q=camisa&por_pagina=10').get_data(as_text=True)
+
+    assert '/buscar?apos=' in html
+    assert 'q=camisa' in html and 'por_pagina=10' in html
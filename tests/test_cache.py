@@ -0,0 +1,21 @@
+"""Limite de memória do cache de fragmentos"""
+from cache import CacheLRU, tamanho_aproximado
+
+
+def test_tamanho_conta_o_conteudo_de_dicts_e_listas():
+    pequeno = {'categorias': [(1, 'A')], 'contagens': {1: (1, 0, [1, 0])}}
+    grande = {'categorias': [(indice, 'Categoria ' * 20) for indice in range(500)],
+              'contagens': {indice: (10, 5, [1, 2, 3]) for indice in range(500)}}
+
+    assert tamanho_aproximado(grande) > 100 * 1024
+    assert tamanho_aproximado(grande) > 50 * tamanho_aproximado(pequeno)
+
+
+def test_teto_de_bytes_vale_para_valores_aninhados():
+    cache = CacheLRU(max_itens=100, max_bytes=64 * 1024)
+    for chave in range(10):
+        cache.guardar(chave, {'linhas': ['x' * 1000 for _ in range(20)]})
+
+    estatisticas = cache.estatisticas()
+    assert estatisticas['bytes'] <= 64 * 1024
+    assert estatisticas['descartados'] > 0
@@ -0,0 +1,34 @@
+"""Adição de produtos ao carrinho"""
+import pytest
+
+from loja_virtual.extensoes import db
+from loja_virtual.modelos import ItemCarrinho, Produto
+
+
+@pytest.fixture
+def produto_id(app):
+    produto = Produto(nome='Caneca', preco=25)
+    db.session.add(produto)
+    db.session.commit()
+    return produto.id
+
+
+def quantidade_no_carrinho(produto_id):
+    return db.session.scalar(db.select(ItemCarrinho.quantidade).where(ItemCarrinho.produto_id == produto_id))
+
+
+def test_adicionar_duas_vezes_soma_a_quantidade(cliente, produto_id):
+    resposta = cliente.post(f'/adicionar_carrinho/{produto_id}', data={'quantidade': '2'}, follow_redirects=True)
+    assert 'Caneca adicionado ao carrinho' in resposta.get_data(as_text=True)
+
+    resposta = cliente.post(f'/adicionar_carrinho/{produto_id}', data={'quantidade': '3'}, follow_redirects=True)
+    assert 'Quantidade de Caneca atualizada' in resposta.get_data(as_text=True)
+    assert quantidade_no_carrinho(produto_id) == 5
+
+
+@pytest.mark.parametrize('enviada, gravada', [('abc', 1), ('0', 1), ('-4', 1), ('1000', 99)])
+def test_quantidade_invalida_fica_entre_1_e_o_maximo(cliente, produto_id, enviada, gravada):
+    resposta = cliente.post(f'/adicionar_carrinho/{produto_id}', data={'quantidade': enviada})
+
+    assert resposta.status_code == 302
+    assert quantidade_no_carrinho(produto_id) == gravada
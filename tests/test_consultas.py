@@ -0,0 +1,80 @@
+"""Quantidade de consultas das listagens e das páginas de categorias (não pode crescer com o catálogo)"""
+from sqlalchemy import event
+
+from loja_virtual.extensoes import cache_fragmentos, db
+from loja_virtual.modelos import Categoria, Produto
+
+
+def popular(categorias, produtos_por_categoria, inicio=0):
+    for indice in range(inicio, inicio + categorias):
+        categoria = Categoria(nome=f'Categoria {indice}')
+        categoria.produtos = [Produto(nome=f'Produto {indice}-{numero}', preco=10)
+                              for numero in range(produtos_por_categoria)]
+        db.session.add(categoria)
+    db.session.commit()
+
+
+def contar_consultas(app, cliente, url):
+    """Executa a requisição e retorna (resposta, quantidade de instruções SQL)"""
+    instrucoes = []
+    def registrar(conn, cursor, statement, parameters, context, executemany):
+        instrucoes.append(statement)
+    cache_fragmentos.limpar()  # sem cache, para que as consultas realmente aconteçam
+    event.listen(db.engine, 'before_cursor_execute', registrar)
+    try:
+        resposta = cliente.get(url)
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', registrar)
+    assert resposta.status_code == 200
+    return resposta, len(instrucoes)
+
+
+def test_listar_categorias_nao_depende_da_quantidade_de_categorias(app, cliente):
+    popular(2, 3)
+    cliente.get('/categorias')  # carrega o usuário da sessão no cache
+    _, poucas = contar_consultas(app, cliente, '/categorias')
+
+    popular(30, 5, inicio=2)
+    resposta, muitas = contar_consultas(app, cliente, '/categorias')
+
+    # Uma consulta das categorias e um COUNT ... GROUP BY com os totais
+    assert poucas == muitas == 2
+    assert b'Categoria 31' in resposta.data
+
+
+def test_editar_categoria_conta_produtos_sem_carregar_a_colecao(app, cliente):
+    popular(1, 40)
+    categoria_id = Categoria.query.one().id
+    cliente.get(f'/categorias/editar/{categoria_id}')
+    resposta, consultas = contar_consultas(app, cliente, f'/categorias/editar/{categoria_id}')
+
+    # A categoria e o COUNT dos produtos
+    assert consultas == 2
+    assert 'possui 40 produto(s)' in resposta.get_data(as_text=True)
+
+
+def test_loja_nao_depende_da_quantidade_de_produtos(app, cliente):
+    popular(2, 1)
+    cliente.get('/')
+    _, poucos = contar_consultas(app, cliente, '/')
+
+    popular(2, 19, inicio=2)
+    resposta, muitos = contar_consultas(app, cliente, '/')
+
+    # A página de produtos (com a categoria de cada um no mesmo SELECT), as
+    # categorias das facetas e o COUNT ... GROUP BY das contagens
+    assert poucos == muitos == 3
+    assert 'Produto 3-2<' in resposta.get_data(as_text=True)  # último da primeira página
+
+
+def test_listar_produtos_nao_depende_da_quantidade_de_produtos(app, cliente):
+    popular(2, 1)
+    cliente.get('/listar_produtos')
+    _, poucos = contar_consultas(app, cliente, '/listar_produtos')
+
+    popular(2, 19, inicio=2)
+    resposta, muitos = contar_consultas(app, cliente, '/listar_produtos')
+
+    # As categorias do filtro e a página de produtos com as categorias
+    assert poucos == muitos == 2
+    assert 'Produto 3-18' in resposta.get_data(as_text=True)
@@ -0,0 +1,42 @@
+"""Geração das variantes: imagens inválidas são erros permanentes"""
+import io
+import os
+
+import pytest
+
+import imagens
+from loja_virtual.modelos import Produto
+from loja_virtual.uploads import processar_imagem
+
+Image = pytest.importorskip('PIL.Image')
+
+
+def gravar_jpeg(pasta, nome, truncar=False):
+    buffer = io.BytesIO()
+    Image.new('RGB', (600, 400), (200, 30, 30)).save(buffer, 'JPEG')
+    dados = buffer.getvalue()
+    os.makedirs(pasta, exist_ok=True)
+    with open(os.path.join(pasta, nome), 'wb') as arquivo:
+        arquivo.write(dados[:len(dados) // 2] if truncar else dados)
+
+
+def test_jpeg_truncado_e_erro_permanente(tmp_path):
+    gravar_jpeg(tmp_path, 'truncada.jpg', truncar=True)
+
+    with pytest.raises(imagens.ERROS_PERMANENTES):
+        imagens.gerar_variantes(str(tmp_path), 'truncada.jpg')
+
+
+def test_processar_imagem_truncada_nao_propaga_o_erro(app):
+    gravar_jpeg(app.config['UPLOAD_FOLDER'], 'truncada.jpg', truncar=True)
+    produto = Produto(nome='Caneca', preco=5, imagem_nome='truncada.jpg', imagem_variantes={'thumb': 96})
+
+    processar_imagem(produto)  # a fila não deve tentar de novo
+
+    assert produto.imagem_variantes is None
+
+
+def test_jpeg_valido_gera_as_variantes(tmp_path):
+    gravar_jpeg(tmp_path, 'valida.jpg')
+
+    assert imagens.gerar_variantes(str(tmp_path), 'valida.jpg') == {'thumb': 96, 'card': 400, 'detail': 600}
@@ -0,0 +1,10 @@
+"""Estatísticas de /admin/perf"""
+import pytest
+
+
+@pytest.mark.parametrize('recentes', ['-3', '0', 'abc'])
+def test_recentes_fora_do_intervalo_nao_retorna_registros(cliente, recentes):
+    resposta = cliente.get(f'/admin/perf?recentes={recentes}')
+
+    assert resposta.status_code == 200
+    assert 'recentes' not in resposta.get_json()
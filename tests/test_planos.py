@@ -0,0 +1,63 @@
+"""Planos de consulta das rotas (verificar-planos) sobre um catálogo realista"""
+import os
+import random
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import insert, text
+
+from loja_virtual.extensoes import db
+from loja_virtual.modelos import Categoria, Produto
+
+# Produtos por categoria: a primeira (a usada nas rotas filtradas) é pequena,
+# para que uma varredura do índice da ordenação leia o catálogo quase inteiro
+TAMANHOS_CATEGORIAS = [15, 400, 900, 60, 1500, 250, 120, 700]
+SEM_CATEGORIA = 80
+
+
+def popular_catalogo(pasta_uploads):
+    aleatorio = random.Random(42)
+    categorias = [Categoria(nome=f'Categoria {indice}') for indice in range(len(TAMANHOS_CATEGORIAS))]
+    db.session.add_all(categorias)
+    db.session.flush()
+
+    inicio = datetime(2025, 1, 1)
+    grupos = [(categoria.id, total) for categoria, total in zip(categorias, TAMANHOS_CATEGORIAS)]
+    linhas = []
+    for categoria_id, total in grupos + [(None, SEM_CATEGORIA)]:
+        for _ in range(total):
+            numero = len(linhas)
+            com_imagem = aleatorio.random() < 0.7
+            linhas.append({
+                'nome': f'{aleatorio.choice(["Camisa", "Calça", "Caneca", "Mochila"])} {numero}',
+                'preco': round(aleatorio.uniform(1, 2000), 2),
+                'descricao': f'Descrição do produto {numero}',
+                'imagem_nome': f'imagem{numero:05d}.jpg' if com_imagem else None,
+                'imagem_data': inicio + timedelta(minutes=aleatorio.randrange(500000)) if com_imagem else None,
+                'categoria_id': categoria_id,
+            })
+    aleatorio.shuffle(linhas)
+    db.session.execute(insert(Produto), linhas)
+    db.session.commit()
+
+    # Uma imagem no disco para a rota /img
+    primeira = min(linha['imagem_nome'] for linha in linhas if linha['imagem_nome'])
+    os.makedirs(pasta_uploads, exist_ok=True)
+    with open(os.path.join(pasta_uploads, primeira), 'wb') as arquivo:
+        arquivo.write(b'\xff\xd8\xff\xd9')
+
+
+# Os planos mudam depois do ANALYZE (o SQLite passa a conhecer a seletividade de
+# cada índice), então a verificação precisa passar nos dois casos
+@pytest.mark.parametrize('analisar', [False, True], ids=['sem-analyze', 'com-analyze'])
+def test_rotas_sem_varredura_completa(app, analisar):
+    popular_catalogo(app.config['UPLOAD_FOLDER'])
+    if analisar:
+        db.session.execute(text('ANALYZE'))
+        db.session.commit()
+
+    resultado = app.test_cli_runner().invoke(args=['verificar-planos'])
+
+    assert resultado.exit_code == 0, resultado.output
+    assert 'Nenhuma varredura completa' in resultado.output
+    assert ' -> 500 ' not in resultado.output
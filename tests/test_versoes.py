@@ -0,0 +1,43 @@
+"""Versões do catálogo e dos usuários: cada commit invalida só o que alterou"""
+import os
+
+from flask import current_app
+from sqlalchemy import update
+
+from loja_virtual.catalogo import versao_catalogo
+from loja_virtual.extensoes import db
+from loja_virtual.modelos import Produto, User
+from loja_virtual.usuarios import versao_usuarios
+
+
+def tocar_no_passado(*chaves):
+    """Volta a data dos arquivos de versão, para que um novo toque seja sempre percebido"""
+    for chave in chaves:
+        caminho = current_app.config[chave]
+        open(caminho, 'a').close()
+        os.utime(caminho, ns=(0, 0))
+
+
+def test_commit_de_produto_muda_so_a_versao_do_catalogo(app):
+    tocar_no_passado('CATALOGO_VERSAO_ARQUIVO', 'USUARIOS_VERSAO_ARQUIVO')
+    db.session.add(Produto(nome='Caneca', preco=25))
+    db.session.commit()
+    assert versao_catalogo() != 0
+    assert versao_usuarios() == 0
+
+
+def test_update_em_lote_de_usuario_muda_so_a_versao_dos_usuarios(app):
+    tocar_no_passado('CATALOGO_VERSAO_ARQUIVO', 'USUARIOS_VERSAO_ARQUIVO')
+    db.session.execute(update(User).values(sessao_versao=User.sessao_versao + 1))
+    db.session.commit()
+    assert versao_usuarios() != 0
+    assert versao_catalogo() == 0
+
+
+def test_rollback_descarta_a_alteracao(app):
+    tocar_no_passado('CATALOGO_VERSAO_ARQUIVO')
+    db.session.add(Produto(nome='Caneca', preco=25))
+    db.session.flush()
+    db.session.rollback()
+    db.session.commit()
+    assert versao_catalogo() == 0